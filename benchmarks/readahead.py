@@ -0,0 +1,121 @@
+"""Benchmark cold-cache image loading with and without bulk reads and readahead hints
+
+Steps through the images of a folder the way Right-arrow navigation
+does and times how long each one takes to decode, for three strategies:
+
+  decoder   Image.open(path), letting the decoder read the file itself
+  bulk      one large sequential read into memory, then decode from it
+  willneed  bulk, plus POSIX_FADV_WILLNEED on the next files beforehand
+
+Each run starts with the folder evicted from the page cache. By default
+this uses POSIX_FADV_DONTNEED per file, which needs no privileges; with
+--drop-caches the whole page cache is dropped instead (root only).
+Run it against the slow storage you care about, e.g. a spinning disk or
+an NFS mount; on a local SSD the strategies come out close.
+
+    uv run python benchmarks/readahead.py ~/Pictures/holiday --limit 100
+"""
+
+import os
+import io
+import sys
+import time
+import argparse
+import statistics
+
+# Make the viewer's packages importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from image.loader import ImageLoader, read_whole_file, advise_willneed
+
+
+def evict(file_paths, drop_caches=False):
+    """Remove the files from the page cache"""
+    if drop_caches:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return
+
+    for file_path in file_paths:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def load_decoder(file_paths, index, hint_count):
+    """Decode straight from the file"""
+    with Image.open(file_paths[index]) as image:
+        image.load()
+
+
+def load_bulk(file_paths, index, hint_count):
+    """Read the whole file, then decode from memory"""
+    with Image.open(io.BytesIO(read_whole_file(file_paths[index]))) as image:
+        image.load()
+
+
+def load_willneed(file_paths, index, hint_count):
+    """Hint the upcoming files, then read and decode like load_bulk"""
+    advise_willneed(file_paths[index + 1:index + 1 + hint_count])
+    load_bulk(file_paths, index, hint_count)
+
+
+STRATEGIES = {'decoder': load_decoder, 'bulk': load_bulk, 'willneed': load_willneed}
+
+
+def run(strategy, file_paths, hint_count, think_time):
+    """Step through file_paths, returning the seconds each image took"""
+    load = STRATEGIES[strategy]
+    timings = []
+    for index in range(len(file_paths)):
+        start = time.perf_counter()
+        load(file_paths, index, hint_count)
+        timings.append(time.perf_counter() - start)
+        if think_time:
+            time.sleep(think_time)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory', help="Folder of images to step through")
+    parser.add_argument('--limit', type=int, default=50, help="Images to load per run (default 50)")
+    parser.add_argument('--hints', type=int, default=4, help="Files hinted ahead by willneed (default 4)")
+    parser.add_argument('--think', type=float, default=0.0,
+                        help="Seconds spent on each image before moving on (default 0)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per strategy (default 1)")
+    parser.add_argument('--strategies', default=','.join(STRATEGIES),
+                        help=f"Comma-separated subset of {', '.join(STRATEGIES)}")
+    parser.add_argument('--drop-caches', action='store_true',
+                        help="Drop the whole page cache between runs (needs root)")
+    args = parser.parse_args()
+
+    if not hasattr(os, 'posix_fadvise'):
+        sys.exit("posix_fadvise is not available on this platform")
+
+    loader = ImageLoader()
+    file_paths = loader.get_image_list(os.path.join(args.directory, ''))[:args.limit]
+    if not file_paths:
+        sys.exit(f"No images found in {args.directory}")
+    total_bytes = sum(os.path.getsize(path) for path in file_paths)
+    print(f"{len(file_paths)} images, {total_bytes / 1024 / 1024:.1f} MB")
+
+    print(f"{'strategy':<10} {'total s':>8} {'mean ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for strategy in args.strategies.split(','):
+        for _ in range(args.repeat):
+            evict(file_paths, args.drop_caches)
+            timings = run(strategy, file_paths, args.hints, args.think)
+            ordered = sorted(timings)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            print(f"{strategy:<10} {sum(timings):8.2f} {statistics.mean(timings) * 1000:8.1f} "
+                  f"{p95 * 1000:8.1f} {ordered[-1] * 1000:8.1f}")
+    loader.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,6 @@ import os
 import logging
 import threading
 import time
-import gc
 
 from gnome_theme import COLORS, FONTS, DIMENSIONS, ICONS
 from core.state import ApplicationState
@@ -18,6 +17,15 @@ from ui.canvas import ImageCanvas
 from ui.statusbar import StatusBar
 from image.processor import ImageProcessor
 from image.loader import ImageLoader
+from image.decoder import DecodeWorker
+from image.cache import DecodedImageCache, FileBytesCache
+from image.prefetch import Prefetcher
+from image.render_worker import RenderWorker
+from image.memory import memory_accountant
+from image.folder_watcher import FolderWatcher
+from image.metadata_cache import MetadataCache
+from image.thumbnails import ThumbnailService
+from image.thumbnail_cache import ThumbnailCache
 from input.keyboard import KeyboardHandler
 from input.mouse import MouseHandler
 from input.drag_drop import DragDropHandler
@@ -37,7 +45,21 @@ class GnomeImageViewer:
         # Initialize core components
         self.state = ApplicationState()
         self.image_processor = ImageProcessor()
-        self.image_loader = ImageLoader()
+        self.metadata_cache = MetadataCache()
+        self.file_cache = FileBytesCache(self.state.file_cache_max_bytes)
+        self.image_loader = ImageLoader(self.metadata_cache, self.file_cache)
+        self.image_cache = DecodedImageCache(self.state.cache_max_bytes)
+        self.decode_worker = DecodeWorker(self.image_loader, self.image_cache, use_processes=True)
+        self.render_worker = RenderWorker(self.image_processor, COLORS['bg_primary'])
+        self.prefetcher = Prefetcher(
+            self.image_loader, self.image_cache, self.state.prefetch_radius,
+            file_radius=self.state.readahead_radius
+        )
+        self.folder_watcher = FolderWatcher(self.image_loader.is_valid_image_file)
+        self.thumbnail_service = ThumbnailService(
+            DIMENSIONS['thumbnail_size'], thumbnail_cache=ThumbnailCache(DIMENSIONS['thumbnail_size'])
+        )
+        self.image_loader.batch_prober = self.thumbnail_service.probe_many
         
         # UI components will be initialized after setup
         self.headerbar = None
@@ -55,6 +77,7 @@ class GnomeImageViewer:
         self.setup_ui()
         self.setup_input_handlers()
         self.schedule_hide_controls()
+        self.poll_workers()
     
     def setup_ui(self):
         """Initialize UI components"""
@@ -99,6 +122,10 @@ class GnomeImageViewer:
             'open_image': self.open_image,
             'toggle_sidebar': self.toggle_sidebar,
             'toggle_fullscreen': self.toggle_fullscreen,
+            'set_sort_mode': self.set_sort_mode,
+            'open_index': self.open_index,
+            'get_thumbnail': self.thumbnail_service.get,
+            'request_thumbnails': self.request_thumbnails,
             'zoom_in': self.zoom_in,
             'zoom_out': self.zoom_out,
             'zoom_original': self.zoom_original,
@@ -131,9 +158,9 @@ class GnomeImageViewer:
             'prev_image': self.prev_image,
             'next_image': self.next_image,
             'has_image': lambda: self.state.original_image is not None,
+            'is_over_image': self.canvas.contains_pointer,
             'set_cursor': self.canvas.set_cursor,
-            'update_pan_offset': self.update_pan_offset,
-            'update_display': self.update_image_display,
+            'pan_image': self.pan_image,
             'show_controls': self.show_controls,
             'schedule_hide_controls': self.schedule_hide_controls,
             'is_valid_image_file': self.image_loader.is_valid_image_file,
@@ -167,26 +194,149 @@ class GnomeImageViewer:
             self.load_image(file_path)
     
     def load_image(self, file_path):
-        """Load an image and update UI"""
+        """Start loading an image in the background
+        
+        While the user skims faster than images decode, a draft at a
+        fraction of the canvas size is shown instead, and decoded properly
+        once they pause.
+        """
+        target_size = self.get_decode_size()
+        draft_size = self.prefetcher.get_draft_size(target_size) if self.prefetcher.is_skimming() else None
+        self.cancel_settle()
+        
+        # Enumerate the folder alongside the decode rather than after it
+        self.open_directory(file_path)
+        
+        # Neighbors warmed by the prefetcher are shown without a round trip
+        cached = self.decode_worker.lookup(file_path, target_size)
+        draft = False
+        if cached is None and draft_size:
+            cached = self.decode_worker.lookup(file_path, draft_size)
+            draft = cached is not None
+        if cached is not None:
+            logger.debug(f"Image cache hit: {file_path}")
+            self.on_image_decoded(file_path, cached, draft)
+            return
+        
+        self.state.loading_file_path = file_path
+        if draft_size:
+            self.decode_worker.submit(file_path, draft_size, tag='draft')
+        else:
+            self.decode_worker.submit(file_path, target_size)
+        self.wake_workers()
+        
+        if self.statusbar:
+            self.statusbar.set_loading(os.path.basename(file_path))
+    
+    def get_decode_size(self):
+        """Get the size images should be decoded at for the first paint"""
+        canvas_width, canvas_height = self.canvas.get_dimensions()
+        if canvas_width <= 1 or canvas_height <= 1:
+            return None
+        return (canvas_width, canvas_height)
+    
+    def schedule_settle(self):
+        """Schedule a proper decode of a skim draft once navigation pauses"""
+        self.cancel_settle()
+        self.state.pending_settle = self.root.after(self.state.settle_delay, self.settle)
+    
+    def cancel_settle(self):
+        """Cancel a pending settle, e.g. because the user moved on"""
+        if self.state.pending_settle:
+            self.root.after_cancel(self.state.pending_settle)
+            self.state.pending_settle = None
+    
+    def settle(self):
+        """Replace the draft on screen with a decode at the normal size"""
+        self.state.pending_settle = None
+        file_path = self.state.current_file_path
+        if not self.state.showing_preview or not file_path or self.state.loading_file_path:
+            return
+        
+        target_size = self.get_decode_size()
+        cached = self.decode_worker.lookup(file_path, target_size)
+        if cached is not None:
+            self.on_image_decoded(file_path, cached)
+        else:
+            self.decode_worker.submit(file_path, target_size, tag='settle')
+            self.wake_workers()
+    
+    def ensure_full_resolution(self):
+        """Request a full-resolution decode once zoom needs more pixels than decoded"""
+        if self.state.showing_preview:
+            return
+        
+        if self.state.full_resolution_requested or self.state.get_source_scale() >= 1.0:
+            return
+        
+        if self.state.zoom_factor > self.state.get_source_scale():
+            self.state.full_resolution_requested = True
+            self.decode_worker.submit(self.state.current_file_path, tag='full')
+            self.wake_workers()
+    
+    def on_full_resolution_decoded(self, file_path, image):
+        """Swap the full-resolution decode in for the reduced one"""
+        if not image or file_path != self.state.current_file_path:
+            return
+        
+        self.state.replace_source(image)
+        self.update_image_display()
+    
+    def on_preview_decoded(self, file_path, image):
+        """Paint a low-resolution preview while the real decode is running"""
+        try:
+            self.state.set_image(image, file_path, self.image_loader.get_full_size(image))
+            self.state.showing_preview = True
+            self.fit_to_window()
+            self.canvas.hide_welcome_text()
+        except Exception as e:
+            logger.error(f"Failed to show preview: {e}")
+    
+    def on_image_decoded(self, file_path, image, draft=False):
+        """Show an image once the decode worker has finished it
+        
+        A draft is shown like a preview: it is refined in place, by
+        settle(), when navigation pauses.
+        """
+        self.state.loading_file_path = None
+        
         try:
-            # Load image
-            image = self.image_loader.load_image(file_path)
             if not image:
+                self.set_status("Ready")
                 messagebox.showerror("Error", "Failed to load image")
                 return
             
+            # Refine an on-screen preview in place, keeping any zoom or pan
+            refining = self.state.showing_preview and file_path == self.state.current_file_path
+            
             # Update state
-            self.state.set_image(image, file_path)
+            if refining:
+                self.state.replace_source(image)
+            else:
+                self.state.set_image(image, file_path, self.image_loader.get_full_size(image))
+            if draft:
+                self.state.showing_preview = True
+                self.schedule_settle()
             
-            # Update image list
-            self.state.image_list = self.image_loader.get_image_list(file_path)
+            # Update image list; a large folder may still be enumerating
+            self.open_directory(file_path)
             self.state.current_index = self.image_loader.get_current_index(
                 self.state.image_list, file_path
             )
             
+            # Warm the cache for Left/Right navigation
+            self.prefetcher.prefetch(self.state.image_list, self.state.current_index, self.get_decode_size())
+            logger.debug(f"Image cache stats: {self.image_cache.get_stats()}")
+            logger.debug(f"File cache stats: {self.file_cache.get_stats()}")
+            logger.debug(f"Memory usage: {memory_accountant.get_usage()}")
+            
             # Update UI
-            self.fit_to_window()
+            if refining:
+                self.update_image_display()
+            else:
+                self.fit_to_window()
             self.update_sidebar_info()
+            self.update_thumbnail_strip()
             self.set_status(f"Loaded: {os.path.basename(file_path)}")
             
             # Hide welcome text
@@ -196,6 +346,149 @@ class GnomeImageViewer:
             logger.error(f"Failed to load image: {e}")
             messagebox.showerror("Error", f"Failed to load image: {str(e)}")
     
+    def poll_workers(self):
+        """Deliver results from background workers on the Tk thread"""
+        try:
+            for file_path, image, tag in self.decode_worker.poll():
+                if tag == 'preview':
+                    self.on_preview_decoded(file_path, image)
+                elif tag == 'full':
+                    self.on_full_resolution_decoded(file_path, image)
+                elif tag == 'draft':
+                    self.on_image_decoded(file_path, image, draft=True)
+                else:
+                    self.on_image_decoded(file_path, image)
+            
+            index = self.image_loader.directory_index
+            if index is not None:
+                paths_changed, probes_changed = index.poll()
+                if paths_changed:
+                    self.on_directory_progress(index)
+                elif probes_changed:
+                    # Only the file details can have changed
+                    self.update_sidebar_info()
+            
+            changes = self.folder_watcher.poll()
+            if changes:
+                self.on_folder_changed(changes)
+            
+            for file_path, thumbnail in self.thumbnail_service.poll():
+                self.sidebar.set_thumbnail(file_path, thumbnail)
+            
+            render = self.render_worker.poll()
+            if render:
+                self.on_render_finished(*render)
+        except Exception as e:
+            logger.error(f"Error processing worker results: {e}")
+        
+        self.schedule_worker_poll(self.workers_busy())
+    
+    def workers_busy(self):
+        """Check if any background work is in flight and needs fast polling"""
+        index = self.image_loader.directory_index
+        return (self.decode_worker.is_busy() or self.state.render_in_flight or
+                self.thumbnail_service.is_busy() or
+                (index is not None and (index.scanning or index.probing)))
+    
+    def schedule_worker_poll(self, busy=True):
+        """Poll quickly while work is in flight, and only occasionally (for folder changes) when idle"""
+        interval = self.state.worker_poll_interval if busy else self.state.worker_idle_poll_interval
+        self.state.worker_poll_timer = self.root.after(interval, self.poll_workers)
+        self.state.worker_poll_idle = not busy
+    
+    def wake_workers(self):
+        """Return to fast polling after handing work to a background worker"""
+        if self.state.worker_poll_idle and self.state.worker_poll_timer:
+            self.root.after_cancel(self.state.worker_poll_timer)
+            self.schedule_worker_poll()
+    
+    def request_thumbnails(self, file_paths):
+        """Queue thumbnails for the sidebar grid"""
+        self.thumbnail_service.request(file_paths)
+        self.wake_workers()
+    
+    def open_directory(self, file_path):
+        """Use the index of the file's directory without waiting for it to be enumerated"""
+        previous = self.image_loader.directory_index
+        directory = os.path.dirname(file_path)
+        watched = self.folder_watcher.is_watching(directory)
+        # Watch before any scan starts; changes during the scan are held until it is merged
+        self.folder_watcher.watch(directory)
+        index = self.image_loader.open_directory(file_path, watched)
+        if previous is not None and index.directory != previous.directory:
+            # Thumbnails queued for the old folder will never be shown
+            self.thumbnail_service.cancel()
+        
+        self.state.image_list = index.paths
+        self.update_image_count(index)
+        self.wake_workers()
+        return index
+    
+    def on_directory_progress(self, index):
+        """Merge a batch of enumerated files into the image list"""
+        self.state.image_list = index.paths
+        
+        # Inserts shift positions; follow the file being shown or loaded
+        position = index.index_of(self.state.loading_file_path or self.state.current_file_path)
+        if position is not None:
+            self.state.current_index = position
+        self.update_image_count(index)
+        self.update_sidebar_info()
+        self.update_thumbnail_strip()
+        
+        if not index.scanning and self.state.current_file_path:
+            self.prefetcher.prefetch(self.state.image_list, self.state.current_index, self.get_decode_size())
+    
+    def set_sort_mode(self, sort_mode):
+        """Change the order images are listed and navigated in"""
+        if sort_mode == self.state.sort_mode:
+            return
+        
+        self.state.sort_mode = sort_mode
+        self.image_loader.set_sort_mode(sort_mode)
+        index = self.image_loader.directory_index
+        if index is not None:
+            self.on_directory_progress(index)
+        if self.headerbar:
+            self.headerbar.set_sort_mode(sort_mode)
+        logger.info(f"Sorting by {sort_mode}")
+    
+    def update_image_count(self, index):
+        """Show how many images the folder has, or has so far while enumerating"""
+        if self.statusbar:
+            self.statusbar.set_count(len(index.paths), complete=not index.scanning)
+    
+    def on_folder_changed(self, changes):
+        """Update the image list in place after files were added, removed or renamed"""
+        for change in changes:
+            if change[0] != 'rescan':
+                self.thumbnail_service.forget(change[1])
+            if change[0] == 'renamed':
+                # Keep following the file on screen (or loading) under its new name
+                if change[1] == self.state.current_file_path:
+                    self.state.current_file_path = change[2]
+                if change[1] == self.state.loading_file_path:
+                    self.state.loading_file_path = change[2]
+        
+        index = self.image_loader.apply_directory_changes(changes)
+        if index is None or index.directory != os.path.dirname(self.state.current_file_path or ''):
+            return
+        
+        # A rescan replaces the list, so always take the index's current one
+        self.state.image_list = index.paths
+        logger.info(f"Folder changed: {len(changes)} change(s), {len(index.paths)} images")
+        position = index.index_of(self.state.current_file_path)
+        if position is None:
+            # The current file is gone; stay at the same place in the list
+            position = min(self.state.current_index, max(len(index.paths) - 1, 0))
+        self.state.current_index = position
+        
+        if index.paths:
+            self.prefetcher.prefetch(self.state.image_list, self.state.current_index, self.get_decode_size())
+        self.update_image_count(index)
+        self.update_sidebar_info()
+        self.update_thumbnail_strip()
+    
     def prev_image(self):
         """Navigate to previous image"""
         if len(self.state.image_list) > 1:
@@ -204,6 +497,7 @@ class GnomeImageViewer:
             )
             if prev_file:
                 self.state.current_index = prev_index
+                self.prefetcher.record_step(prev_index, len(self.state.image_list))
                 self.load_image(prev_file)
     
     def next_image(self):
@@ -214,73 +508,177 @@ class GnomeImageViewer:
             )
             if next_file:
                 self.state.current_index = next_index
+                self.prefetcher.record_step(next_index, len(self.state.image_list))
                 self.load_image(next_file)
     
+    def open_index(self, index):
+        """Jump to an image by its position in the list"""
+        if 0 <= index < len(self.state.image_list) and index != self.state.current_index:
+            self.state.current_index = index
+            self.prefetcher.record_step(index, len(self.state.image_list))
+            self.load_image(self.state.image_list[index])
+    
     # Display operations
-    def update_image_display(self):
-        """Update the image display"""
+    def update_image_display(self, quality='full'):
+        """Update the image display
+        
+        Interactive renders use quality='fast' and schedule a single
+        full-quality refine once interaction has been idle for a while.
+        """
         if not self.state.original_image:
             return
         
+        if quality == 'fast':
+            self.schedule_refine()
+        else:
+            self.cancel_refine()
+        
         try:
-            # Process image
-            processed_image, actual_zoom = self.image_processor.process_image(
-                self.state.original_image,
-                self.state.zoom_factor,
-                self.state.rotation_angle,
-                self.state.flip_horizontal,
-                self.state.flip_vertical
-            )
+            # Zoom is relative to the full-resolution image; the decoded
+            # source may be reduced, so rescale before processing
+            source_scale = self.state.get_source_scale()
+            self.ensure_full_resolution()
             
-            if not processed_image:
-                return
+            canvas_width, canvas_height = self.canvas.get_dimensions()
+            
+            # Render only the part of the image inside the canvas, off the Tk thread
+            self.render_worker.submit(
+                original_image=self.state.original_image,
+                zoom_factor=self.state.zoom_factor / source_scale,
+                rotation_angle=self.state.rotation_angle,
+                flip_horizontal=self.state.flip_horizontal,
+                flip_vertical=self.state.flip_vertical,
+                canvas_width=canvas_width,
+                canvas_height=canvas_height,
+                image_offset_x=self.state.image_offset_x,
+                image_offset_y=self.state.image_offset_y,
+                margin=self.state.render_margin,
+                quality=quality,
+                pyramid=self.state.image_pyramid
+            )
+            self.state.render_in_flight = True
+            self.wake_workers()
             
-            # Update actual zoom factor
-            self.state.zoom_factor = actual_zoom
+            # Update toolbar
+            if self.toolbar:
+                self.toolbar.update_zoom_label(self.state.zoom_factor)
             
-            # Create PhotoImage
-            photo_image = self.image_processor.create_photo_image(processed_image)
-            if not photo_image:
+        except Exception as e:
+            logger.error(f"Error updating image display: {e}")
+    
+    def on_render_finished(self, params, frame, position):
+        """Show a finished frame from the render worker"""
+        self.state.render_in_flight = False
+        
+        try:
+            if params['original_image'] is not self.state.original_image:
                 return
             
-            # Clean up previous image
-            if self.state.current_image:
-                self.image_processor.cleanup_image(self.state.current_image)
+            if not frame:
+                # Panned completely out of view
+                self.canvas.hide_frame()
+                self.state.rendered_rect = None
+                self.state.rendered_image = None
+                return
             
-            # Update canvas
-            self.state.current_image = photo_image
-            self.canvas.delete_by_tag("image")
+            # Account for panning that happened while the render was running
+            x = position[0] + self.state.image_offset_x - params['image_offset_x']
+            y = position[1] + self.state.image_offset_y - params['image_offset_y']
             
-            # Calculate positioning
-            canvas_width, canvas_height = self.canvas.get_dimensions()
-            x_center = max(processed_image.width // 2, canvas_width // 2) + self.state.image_offset_x
-            y_center = max(processed_image.height // 2, canvas_height // 2) + self.state.image_offset_y
+            # An unchanged frame only needs repositioning; anything else is
+            # pasted into the persistent display surface
+            if frame is self.state.rendered_image:
+                self.canvas.move_to("image", x, y)
+            else:
+                self.state.current_image = self.canvas.show_frame(frame, x, y)
+                self.state.rendered_image = frame
             
-            # Create image on canvas
-            self.canvas.create_image(x_center, y_center, photo_image, tags="image")
+            self.state.rendered_rect = (x, y, x + frame.width, y + frame.height)
             
-            # Configure scroll region
-            self.canvas.configure_scroll_region(self.canvas.get_bbox("all"))
+            # Keep the view pinned to the canvas origin; the frame already
+            # covers the visible area
+            canvas_width, canvas_height = self.canvas.get_dimensions()
+            self.canvas.configure_scroll_region((0, 0, canvas_width, canvas_height))
             
             # Hide scrollbars for minimal interface
             self.canvas.hide_scrollbars()
             
-            # Update toolbar
-            if self.toolbar:
-                self.toolbar.update_zoom_label(self.state.zoom_factor)
-            
-            # Clean up processed image
-            self.image_processor.cleanup_image(processed_image)
+            # Panning may have outrun this render too
+            if self.state.rotation_angle % 90 == 0 and not self.is_view_covered():
+                self.update_image_display(quality='fast')
             
         except Exception as e:
             logger.error(f"Error updating image display: {e}")
-            gc.collect()
     
     def update_pan_offset(self, dx, dy):
         """Update pan offset"""
         self.state.image_offset_x += dx
         self.state.image_offset_y += dy
     
+    def pan_image(self, dx, dy):
+        """Pan by moving the rendered image, re-rendering only when it runs out"""
+        self.update_pan_offset(dx, dy)
+        
+        if self.state.rendered_rect is None or self.state.rotation_angle % 90 != 0:
+            self.update_image_display(quality='fast')
+            return
+        
+        self.canvas.move("image", dx, dy)
+        left, top, right, bottom = self.state.rendered_rect
+        self.state.rendered_rect = (left + dx, top + dy, right + dx, bottom + dy)
+        
+        # A render already in flight re-checks coverage when it lands
+        if not self.is_view_covered() and not self.state.render_in_flight:
+            self.update_image_display(quality='fast')
+        elif self.state.pending_refine:
+            # Still interacting; push the refine back
+            self.schedule_refine()
+    
+    def schedule_refine(self):
+        """Schedule a full-quality render after the interaction goes idle"""
+        self.cancel_refine()
+        self.state.pending_refine = self.root.after(self.state.refine_delay, self.refine_display)
+    
+    def cancel_refine(self):
+        """Cancel a pending full-quality render"""
+        if self.state.pending_refine:
+            self.root.after_cancel(self.state.pending_refine)
+            self.state.pending_refine = None
+    
+    def refine_display(self):
+        """Replace the interactive render with a full-quality one"""
+        self.state.pending_refine = None
+        self.update_image_display(quality='full')
+    
+    def is_view_covered(self):
+        """Check if the current render covers every visible image pixel"""
+        if self.state.rendered_rect is None:
+            return False
+        
+        canvas_width, canvas_height = self.canvas.get_dimensions()
+        # Same geometry process_image uses for the decoded source
+        display_width, display_height = self.image_processor.get_display_size(
+            self.state.original_image.size,
+            self.state.zoom_factor / self.state.get_source_scale(),
+            self.state.rotation_angle
+        )
+        img_left, img_top = self.image_processor.get_image_position(
+            display_width, display_height, canvas_width, canvas_height,
+            self.state.image_offset_x, self.state.image_offset_y
+        )
+        
+        # Part of the canvas the image currently occupies
+        needed_left = max(0, img_left)
+        needed_top = max(0, img_top)
+        needed_right = min(canvas_width, img_left + display_width)
+        needed_bottom = min(canvas_height, img_top + display_height)
+        if needed_right <= needed_left or needed_bottom <= needed_top:
+            return True
+        
+        left, top, right, bottom = self.state.rendered_rect
+        return (left <= needed_left and top <= needed_top and
+                right >= needed_right and bottom >= needed_bottom)
+    
     # Zoom operations
     def zoom_in(self):
         """Zoom in"""
@@ -319,8 +717,8 @@ class GnomeImageViewer:
         
         # Calculate fit zoom
         zoom_factor = self.image_processor.calculate_fit_zoom(
-            self.state.original_image.width,
-            self.state.original_image.height,
+            self.state.image_size[0],
+            self.state.image_size[1],
             canvas_width,
             canvas_height,
             self.state.rotation_angle
@@ -332,14 +730,12 @@ class GnomeImageViewer:
         self.update_image_display()
     
     def throttled_update_display(self):
-        """Throttle display updates"""
-        if self.image_processor.should_throttle_zoom():
-            if self.state.pending_zoom_update:
-                self.root.after_cancel(self.state.pending_zoom_update)
-            self.state.pending_zoom_update = self.root.after(50, self.update_image_display)
-        else:
-            self.image_processor.update_throttle_time()
-            self.update_image_display()
+        """Render an interactive zoom step
+        
+        The render worker's mailbox keeps only the latest request, so
+        bursts of zoom steps coalesce without timer-based debouncing.
+        """
+        self.update_image_display(quality='fast')
     
     def crop_to_window(self):
         """Crop image to visible window area"""
@@ -349,25 +745,18 @@ class GnomeImageViewer:
         try:
             canvas_width, canvas_height = self.canvas.get_dimensions()
             
-            # Process the image with current transformations
-            processed_image, _ = self.image_processor.process_image(
+            # The viewport render is exactly the visible area
+            cropped_image, _, _ = self.image_processor.process_image(
                 self.state.original_image,
-                self.state.zoom_factor,
+                self.state.zoom_factor / self.state.get_source_scale(),
                 self.state.rotation_angle,
                 self.state.flip_horizontal,
-                self.state.flip_vertical
-            )
-            
-            if not processed_image:
-                return
-            
-            # Crop to visible area
-            cropped_image = self.image_processor.crop_image(
-                processed_image,
+                self.state.flip_vertical,
                 canvas_width,
                 canvas_height,
                 self.state.image_offset_x,
-                self.state.image_offset_y
+                self.state.image_offset_y,
+                pyramid=self.state.image_pyramid
             )
             
             if not cropped_image:
@@ -395,10 +784,6 @@ class GnomeImageViewer:
                 else:
                     messagebox.showerror("Save Error", "Failed to save cropped image")
             
-            # Clean up
-            self.image_processor.cleanup_image(processed_image)
-            self.image_processor.cleanup_image(cropped_image)
-            
         except Exception as e:
             logger.error(f"Error cropping image: {e}")
             messagebox.showerror("Crop Error", f"Failed to crop image: {str(e)}")
@@ -458,10 +843,17 @@ class GnomeImageViewer:
             
             logger.info("Exited fullscreen mode")
     
+    def update_thumbnail_strip(self):
+        """Point the sidebar's thumbnail grid at the image list and current image"""
+        if self.sidebar:
+            self.sidebar.set_thumbnail_paths(self.state.image_list, self.state.current_index)
+    
     def update_sidebar_info(self):
         """Update sidebar information"""
         if self.sidebar:
-            info = self.state.get_image_info()
+            index = self.image_loader.directory_index
+            probe = index.get_probe(self.state.current_file_path) if index is not None else None
+            info = self.state.get_image_info(probe)
             if info:
                 self.sidebar.update_info(info)
     
@@ -518,17 +910,28 @@ class GnomeImageViewer:
         
         self.cancel_hide_timer()
         
-        if self.state.pending_zoom_update:
-            self.root.after_cancel(self.state.pending_zoom_update)
+        if self.state.worker_poll_timer:
+            self.root.after_cancel(self.state.worker_poll_timer)
         
-        if self.state.current_image:
-            self.image_processor.cleanup_image(self.state.current_image)
+        self.cancel_refine()
+        self.cancel_settle()
         
-        if self.state.original_image:
-            self.image_processor.cleanup_image(self.state.original_image)
+        self.decode_worker.shutdown()
+        self.render_worker.shutdown()
+        self.prefetcher.shutdown()
+        self.thumbnail_service.shutdown()
+        self.folder_watcher.stop()
+        self.image_loader.shutdown()
+        self.metadata_cache.close()
+        self.image_cache.clear()
+        self.file_cache.clear()
+        
+        if self.canvas:
+            self.canvas.release_surface()
+        self.state.current_image = None
         
         if self.mouse_handler:
             self.mouse_handler.stop_mouse_listener()
         
-        gc.collect()
+        logger.debug(f"Memory usage at exit: {memory_accountant.get_usage()}")
         logger.info("Application cleanup complete")
\ No newline at end of file
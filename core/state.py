@@ -2,6 +2,7 @@
 
 import os
 import logging
+from image.pyramid import ImagePyramid
 
 logger = logging.getLogger(__name__)
 
@@ -13,9 +14,14 @@ class ApplicationState:
         # Image state
         self.current_image = None
         self.original_image = None
+        self.image_pyramid = None
+        self.image_size = (0, 0)  # Full-resolution size, even for reduced decodes
+        self.full_resolution_requested = False
+        self.showing_preview = False
         self.current_file_path = None
         self.image_list = []
         self.current_index = 0
+        self.loading_file_path = None
         
         # Display state
         self.zoom_factor = 1.0
@@ -28,6 +34,7 @@ class ApplicationState:
         
         # UI state
         self.sidebar_visible = False
+        self.sort_mode = 'name'
         self.fullscreen_mode = False
         self.toolbar_visible = True
         self.controls_visible = True
@@ -38,6 +45,9 @@ class ApplicationState:
         self.pan_start_y = 0
         self.image_offset_x = 0
         self.image_offset_y = 0
+        self.rendered_rect = None  # Canvas area covered by the current render
+        self.rendered_image = None  # PIL frame last pasted into current_image
+        self.render_margin = 256  # Extra pixels rendered around the viewport for panning
         
         # Auto-hide state
         self.hide_timer = None
@@ -48,11 +58,24 @@ class ApplicationState:
         self.last_scroll_time = 0
         self.scroll_threshold = 0.1
         
-        # Throttling state
-        self.zoom_throttle_time = 0
-        self.zoom_throttle_delay = 0.05  # 50ms between zoom operations
-        self.pending_zoom_update = None
-        self.max_image_size = 4000  # Max width/height to prevent memory issues
+        # Render state
+        self.render_in_flight = False
+        self.pending_refine = None
+        self.refine_delay = 200  # ms of idle before the full-quality render
+        
+        # Background worker state
+        self.worker_poll_timer = None
+        self.worker_poll_interval = 15  # ms between worker result checks
+        self.worker_idle_poll_interval = 250  # ms between checks while nothing is in flight
+        self.worker_poll_idle = False
+        
+        # Decoded image cache and prefetch state
+        self.cache_max_bytes = 512 * 1024 * 1024  # 512 MB of decoded pixels
+        self.prefetch_radius = 2  # Images to warm on either side
+        self.file_cache_max_bytes = 256 * 1024 * 1024  # 256 MB of undecoded files
+        self.readahead_radius = 12  # Files to keep in memory on either side
+        self.pending_settle = None
+        self.settle_delay = 150  # ms after the last step before a skim draft is decoded properly
     
     def reset_transformations(self):
         """Reset all image transformations to defaults"""
@@ -64,23 +87,64 @@ class ApplicationState:
         self.image_offset_y = 0
         logger.debug("Transformations reset to defaults")
     
-    def set_image(self, image, file_path):
+    def set_image(self, image, file_path, full_size=None):
         """Set the current image and file path"""
         self.original_image = image
+        self.set_pyramid(image)
+        self.image_size = full_size or image.size
+        self.full_resolution_requested = False
+        self.showing_preview = False
         self.current_file_path = file_path
         self.reset_transformations()
         logger.info(f"Image state updated: {os.path.basename(file_path) if file_path else 'None'}")
     
-    def get_image_info(self):
-        """Get current image information"""
+    def replace_source(self, image):
+        """Swap in a higher resolution decode of the current image, keeping transformations"""
+        self.original_image = image
+        self.set_pyramid(image)
+        self.showing_preview = False
+        logger.debug(f"Source replaced with {image.width}x{image.height} decode")
+    
+    def set_pyramid(self, image):
+        """Replace the pyramid, freeing the reductions of the previous image"""
+        if self.image_pyramid:
+            self.image_pyramid.clear()
+        self.image_pyramid = ImagePyramid(image)
+    
+    def get_source_scale(self):
+        """Get the scale of the decoded image relative to the full-resolution image"""
+        if not self.original_image or not self.image_size[0]:
+            return 1.0
+        return self.original_image.width / self.image_size[0]
+    
+    def get_format_description(self, probe):
+        """Describe the file format, mode and frame count from a probe result"""
+        if not probe:
+            return ""
+        
+        description = f"{probe['format'] or 'Unknown'} · {probe['mode']}"
+        if probe['frames'] is None:
+            description += " · animated"
+        elif probe['frames'] > 1:
+            description += f" · {probe['frames']} frames"
+        return description
+    
+    def get_image_info(self, probe=None):
+        """Get current image information, using the file's probe result when available"""
         if not self.current_file_path or not self.original_image:
             return None
         
         filename = os.path.basename(self.current_file_path)
-        file_size = os.path.getsize(self.current_file_path)
+        try:
+            file_size = probe['file_size'] if probe else os.path.getsize(self.current_file_path)
+        except OSError:
+            # Deleted or moved away while on screen
+            file_size = None
         
         # Format file size
-        if file_size < 1024:
+        if file_size is None:
+            size_str = "Unknown"
+        elif file_size < 1024:
             size_str = f"{file_size} B"
         elif file_size < 1024 * 1024:
             size_str = f"{file_size / 1024:.1f} KB"
@@ -90,6 +154,7 @@ class ApplicationState:
         return {
             'filename': filename,
             'size': size_str,
-            'dimensions': f"{self.original_image.width} × {self.original_image.height}",
+            'dimensions': f"{self.image_size[0]} × {self.image_size[1]}",
+            'format': self.get_format_description(probe),
             'zoom': f"{int(self.zoom_factor * 100)}%"
         }
\ No newline at end of file
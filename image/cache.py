@@ -0,0 +1,138 @@
+"""Decoded image caching"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from image.memory import image_bytes
+
+logger = logging.getLogger(__name__)
+
+
+class DecodedImageCache:
+    """LRU cache of decoded PIL images bounded by total pixel bytes"""
+
+    # Used in log messages
+    name = 'image cache'
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters for sizing the budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Dropped by retain() as the window moved, not by budget pressure
+        self.demotions = 0
+
+    @staticmethod
+    def make_key(file_path, target_size=None):
+        """Build a cache key that changes whenever the file changes
+        
+        Reduced decodes are cached separately per target size; a
+        target_size of None means the full-resolution decode.
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (file_path, stat.st_mtime_ns, stat.st_size, target_size)
+
+    @staticmethod
+    def sizeof(image):
+        """Get the bytes an entry counts against the budget"""
+        return image_bytes(image)
+
+    def get(self, key):
+        """Get a cached image, or None on a miss"""
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key):
+        """Check for a key without touching the LRU order or counters"""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, image):
+        """Add an image, evicting least recently used entries over budget"""
+        if key is None or image is None:
+            return
+
+        size = self.sizeof(image)
+        if size > self.max_bytes:
+            logger.debug(f"Too large for the {self.name} ({size} bytes): {key[0]}")
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+
+            self._entries[key] = (image, size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                old_key, (_, old_size) = self._entries.popitem(last=False)
+                self.current_bytes -= old_size
+                self.evictions += 1
+                logger.debug(f"Evicted from {self.name}: {old_key[0]}")
+
+    def retain(self, file_paths):
+        """Drop the entries of every file not in file_paths"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] not in file_paths]:
+                _, size = self._entries.pop(key)
+                self.current_bytes -= size
+                self.demotions += 1
+
+    def clear(self):
+        """Drop all cached images"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self):
+        """Get cache counters and usage"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'demotions': self.demotions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+class FileBytesCache(DecodedImageCache):
+    """LRU cache of undecoded file contents bounded by total bytes
+
+    The wide, cheap tier under DecodedImageCache: compressed files are a
+    fraction of their decoded size, so many more neighbors fit, and
+    decoding one from memory skips the disk entirely. Entries are keyed
+    like decoded images, with a target_size of None.
+    """
+
+    name = 'file cache'
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        super().__init__(max_bytes)
+
+    @staticmethod
+    def sizeof(data):
+        """Get the bytes an entry counts against the budget"""
+        return len(data)
@@ -0,0 +1,218 @@
+"""Background image decoding"""
+
+import logging
+import queue
+import threading
+import os
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ThreadPoolExecutor, BrokenExecutor
+from PIL import Image
+from image.loader import get_worker_loader, start_process_pool
+from image.memory import memory_accountant
+
+logger = logging.getLogger(__name__)
+
+# Modes Image.frombuffer() maps without copying (PIL.Image._MAPMODES); RGB is padded to RGBX
+SHAREABLE_MODES = ('L', 'P', 'RGBX', 'RGBA', 'CMYK', 'I;16', 'I;16L', 'I;16B')
+
+
+def create_segment(size):
+    """Create a shared memory segment that the receiving process will unlink"""
+    try:
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:
+        # Before Python 3.13 the creator's resource tracker would unlink it again.
+        # It registers the POSIX name, which keeps the leading slash .name drops.
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        if os.name == 'posix':
+            resource_tracker.unregister('/' + segment.name, 'shared_memory')
+        return segment
+
+
+def decode_shared(file_path, target_size=None, data=None):
+    """Decode an image in a worker process into a shared memory segment
+    
+    data, when given, is the file's contents already read by the caller.
+    Returns (segment name, mode, size, info), the image itself for
+    modes that can't be mapped, or None if decoding failed. info holds
+    full_size and, for palette images, the palette and transparency.
+    """
+    image = get_worker_loader().load_image(file_path, target_size, data)
+    if image is None:
+        return None
+
+    mode = 'RGBX' if image.mode == 'RGB' else image.mode
+    if mode not in SHAREABLE_MODES:
+        return image
+
+    info = {'full_size': image.info.get('full_size', image.size)}
+    if mode == 'P':
+        info['palette'] = (image.palette.mode, image.getpalette(image.palette.mode))
+        if 'transparency' in image.info:
+            info['transparency'] = image.info['transparency']
+
+    # Map the segment as an image and paste straight into it: the pixels
+    # are copied once, from the decode into shared memory. The core paste
+    # is used because Image.paste() would first convert RGB to an RGBX
+    # copy, and copy the read-only mapped image again.
+    row_bytes = len(Image.new(mode, (1, 1)).tobytes()) * image.width
+    segment = create_segment(max(1, row_bytes * image.height))
+    shared = Image.frombuffer(mode, image.size, segment.buf, 'raw', mode, 0, 1)
+    shared.im.paste(image.im, (0, 0) + image.size)
+    result = (segment.name, mode, image.size, info)
+    # The mapping must go before the segment can close
+    shared.close()
+    del shared
+    image.close()
+    segment.close()
+    return result
+
+
+def attach_shared(result):
+    """Wrap a decode_shared() result as an image without copying its pixels
+    
+    The segment is unlinked right away, so it can't leak if this process
+    dies; the mapping itself lives exactly as long as the image, which
+    holds the only reference to it. Evicting the image from the decoded
+    image cache (and dropping any other references) releases it.
+    """
+    if result is None or isinstance(result, Image.Image):
+        return result
+
+    name, mode, size, info = result
+    segment = shared_memory.SharedMemory(name=name)
+    segment.unlink()
+
+    image = Image.frombuffer(mode, size, segment.buf, 'raw', mode, 0, 1)
+    if 'palette' in info:
+        palette_mode, palette = info.pop('palette')
+        image.putpalette(palette, palette_mode)
+    image.info.update(info)
+    # Set after image.im, so the pixel mapping is released before the segment closes
+    image._shared_memory = segment
+    return image
+
+
+class DecodeWorker:
+    """Decodes images on a worker pool and hands them back to the Tk loop
+
+    With use_processes the decoding itself runs in worker processes,
+    which hand pixels back through shared memory instead of pickling
+    them; the pool threads only schedule the work and attach results.
+    """
+
+    def __init__(self, image_loader, image_cache=None, max_workers=2, use_processes=False):
+        self.image_loader = image_loader
+        self.image_cache = image_cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="decode")
+        self.process_executor = start_process_pool(max_workers) if use_processes else None
+        if self.process_executor is not None:
+            # Start the workers now rather than on the first image
+            self.process_executor.submit(get_worker_loader)
+        self.results = queue.Queue()
+        self.generation = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def is_busy(self):
+        """Check if decodes are queued, running or waiting to be polled"""
+        return self._active > 0 or not self.results.empty()
+
+    def submit(self, file_path, target_size=None, tag='display'):
+        """Queue a decode request, superseding all earlier requests
+        
+        The tag is handed back with the result so the caller can tell a
+        fresh load from a full-resolution upgrade of the current image.
+        Display requests first hand back a 'preview' result when a cheap
+        one is available.
+        """
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+            self._active += 1
+
+        self.executor.submit(self._decode, generation, file_path, target_size, tag)
+        logger.debug(f"Decode requested (generation {generation}, {tag}): {file_path}")
+        return generation
+
+    def lookup(self, file_path, target_size=None):
+        """Get an already decoded image from the cache, superseding pending requests"""
+        if not self.image_cache:
+            return None
+
+        # A full-resolution decode can stand in for any reduced one
+        key = self.image_cache.make_key(file_path)
+        if target_size and not self.image_cache.contains(key):
+            key = self.image_cache.make_key(file_path, target_size)
+
+        image = self.image_cache.get(key)
+        if image is not None:
+            with self._lock:
+                self.generation += 1
+        return image
+
+    def _decode(self, generation, file_path, target_size, tag):
+        """Decode a file on a worker thread"""
+        try:
+            self._decode_file(generation, file_path, target_size, tag)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _decode_file(self, generation, file_path, target_size, tag):
+        """Decode a file and queue the results"""
+        # Skip the work entirely if the user has already moved on
+        if generation != self.generation:
+            return
+
+        if tag == 'display':
+            preview = self.image_loader.load_preview(file_path)
+            if preview is not None and generation == self.generation:
+                self.results.put((generation, file_path, preview, 'preview'))
+
+        image = self._load(file_path, target_size)
+        if image and self.image_cache:
+            self.image_cache.put(self.image_cache.make_key(file_path, target_size), image)
+        self.results.put((generation, file_path, image, tag))
+
+    def _load(self, file_path, target_size):
+        """Decode in a worker process when available, otherwise on this thread"""
+        if self.process_executor is not None:
+            # Files already in memory are sent along rather than read again
+            data = self.image_loader.get_cached_file(file_path)
+            try:
+                result = self.process_executor.submit(decode_shared, file_path, target_size, data).result()
+                return memory_accountant.track(attach_shared(result), 'decoded')
+            except BrokenExecutor as e:
+                logger.warning(f"Decode processes failed ({e}), decoding on threads")
+                self.process_executor = None
+            except Exception as e:
+                logger.error(f"Error decoding {file_path} in worker: {e}")
+                return None
+        return self.image_loader.load_image(file_path, target_size)
+    
+    def poll(self):
+        """Collect finished decodes, dropping results for outdated requests"""
+        finished = []
+        while True:
+            try:
+                generation, file_path, image, tag = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if generation != self.generation:
+                # The image stays in the cache for when the user comes back
+                logger.debug(f"Dropping stale decode: {file_path}")
+                continue
+
+            finished.append((file_path, image, tag))
+        return finished
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        with self._lock:
+            self.generation += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.process_executor is not None:
+            self.process_executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Decode worker stopped")
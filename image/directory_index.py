@@ -0,0 +1,388 @@
+"""Cached index of the images in a directory"""
+
+import os
+import re
+import time
+import queue
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SORT_MODES = {
+    'name': "Name",
+    'modified': "Date Modified",
+    'size': "Size",
+    'taken': "Date Taken",
+}
+
+DIGITS = re.compile(r'(\d+)')
+
+
+def natural_key(name):
+    """Sort key that orders embedded numbers by value, so IMG_9 comes before IMG_10"""
+    parts = DIGITS.split(name.lower())
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+class DirectoryIndex:
+    """Sorted image paths of one directory with an O(1) path to position map
+
+    Built from a single os.scandir pass, either synchronously with scan()
+    or in batches from a background thread with start_scan() and
+    poll(). The stat results from the scan are kept per path so
+    later consumers do not need to stat again, and the directory's mtime
+    tells when the index has gone stale.
+
+    Paths are kept in the order of sort_mode, with each path's sort key
+    cached until its stat or probe changes, so re-sorting never stats or
+    parses files again. With a probe_reader, which takes lists of paths
+    and their stats and returns a probe for each, every indexed file is
+    also probed (header only) on a small thread pool; the results feed the
+    'taken' order and anyone else that needs dimensions or metadata.
+    """
+
+    # Paths handed to each probe pool task
+    PROBE_CHUNK = 256
+
+    def __init__(self, directory, extensions, probe_reader=None, sort_mode='name'):
+        self.directory = directory
+        self.extensions = extensions
+        self.probe_reader = probe_reader
+        self.sort_mode = sort_mode
+        self.mtime_ns = None
+        self.paths = []
+        self.stats = {}
+        self.probes = {}
+        self.scanning = False
+        self.probing = False
+        self._keys = {}
+        self._name_keys = {}
+        self._positions = {}
+        self._batches = None
+        self._seen = None
+        self._cancel = None
+        self._held_changes = []
+        self._probe_executor = None
+        self._probe_results = queue.Queue()
+        self._probes_pending = set()
+
+    def iter_batches(self, batch_size=2000):
+        """Yield lists of (path, stat) for the directory's images from one scandir pass"""
+        batch = []
+        with os.scandir(self.directory or '.') as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not self.is_image_name(entry.name):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    batch.append((os.path.join(self.directory, entry.name), entry.stat()))
+                except OSError:
+                    continue
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def scan(self):
+        """Rebuild the index from disk"""
+        self.cancel_scan()
+        self.mtime_ns = os.stat(self.directory or '.').st_mtime_ns
+
+        stats = {}
+        for batch in self.iter_batches():
+            stats.update(batch)
+
+        self.stats = stats
+        self._keys.clear()
+        self.paths = sorted(stats, key=self.sort_key)
+        self._positions = None
+        self.request_probes(self.paths)
+        logger.info(f"Indexed {len(self.paths)} images in {self.directory or '.'}")
+        return self
+
+    def start_scan(self, batch_size=2000):
+        """Rescan on a background thread; merge the results with poll()
+
+        Entries already in the index stay visible while scanning and are
+        dropped at the end if the scan did not see them.
+        """
+        self.cancel_scan()
+        self.mtime_ns = os.stat(self.directory or '.').st_mtime_ns
+        self.scanning = True
+        self._batches = queue.Queue()
+        self._seen = set()
+        self._cancel = threading.Event()
+        # The new scan sees the result of anything held so far
+        self._held_changes = []
+
+        thread = threading.Thread(
+            target=self._scan_worker, args=(self._batches, self._cancel, batch_size),
+            name="directory-scan", daemon=True
+        )
+        thread.start()
+        return self
+
+    def _scan_worker(self, batches, cancel, batch_size):
+        """Feed scandir batches to the queue until done or cancelled"""
+        try:
+            for batch in self.iter_batches(batch_size):
+                if cancel.is_set():
+                    return
+                batches.put(batch)
+        except OSError as e:
+            logger.error(f"Error scanning {self.directory or '.'}: {e}")
+        batches.put(None)
+
+    def cancel_scan(self):
+        """Stop a background scan, keeping what was merged so far"""
+        if self._cancel:
+            self._cancel.set()
+        self.scanning = False
+        self._batches = None
+        self._seen = None
+        self._cancel = None
+
+    def close(self):
+        """Stop background scanning and probing"""
+        self.cancel_scan()
+        if self._probe_executor:
+            self._probe_executor.shutdown(wait=False, cancel_futures=True)
+            self._probe_executor = None
+
+    def poll(self):
+        """Merge results from the background scan and probes
+
+        Returns (paths_changed, probes_changed): whether paths were added,
+        removed or reordered (or the scan finished), and whether new probe
+        results arrived.
+        """
+        probes_changed = self.poll_probes()
+        # Keys only change here, all at once, so the list never holds
+        # keys from before and after a probe at the same time
+        resorted = probes_changed and not self.probing and self.sort_mode == 'taken'
+        if resorted:
+            self.resort()
+        return self.poll_scan() or resorted, probes_changed
+
+    def poll_scan(self):
+        """Merge batches from the background scan; returns True if the index changed"""
+        if not self.scanning:
+            return False
+
+        new_paths = []
+        finished = False
+        while True:
+            try:
+                batch = self._batches.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                finished = True
+                break
+            for path, stat in batch:
+                self._seen.add(path)
+                if path not in self.stats:
+                    new_paths.append(path)
+                    self.stats[path] = stat
+                elif self.stats[path].st_mtime_ns != stat.st_mtime_ns or self.stats[path].st_size != stat.st_size:
+                    self.remove(path)
+                    new_paths.append(path)
+                    self.stats[path] = stat
+
+        if new_paths:
+            # Sorting a sorted list with a run appended is close to linear
+            self.paths.extend(new_paths)
+            self.paths.sort(key=self.sort_key)
+            self._positions = None
+            self.request_probes(new_paths)
+
+        if finished:
+            missing = [path for path in self.stats if path not in self._seen]
+            for path in missing:
+                self.remove(path)
+            self.cancel_scan()
+            logger.info(f"Indexed {len(self.paths)} images in {self.directory or '.'}")
+            held, self._held_changes = self._held_changes, []
+            if held and not self.apply_changes(held):
+                self.start_scan()
+        return bool(new_paths) or finished
+
+    def is_image_name(self, name):
+        """Check a file name against the image extensions, ignoring case"""
+        return os.path.splitext(name)[1].lower() in self.extensions
+
+    def is_stale(self):
+        """Check if the directory changed since the last scan"""
+        if self.scanning:
+            return False
+        try:
+            return os.stat(self.directory or '.').st_mtime_ns != self.mtime_ns
+        except OSError:
+            return True
+
+    def index_of(self, path):
+        """Get the position of a path, or None if it is not indexed"""
+        # Rebuilt lazily so a burst of changes only pays for it once
+        if self._positions is None:
+            self._positions = {path: index for index, path in enumerate(self.paths)}
+        return self._positions.get(path)
+
+    def sort_key(self, path):
+        """Get the key of a path in the current sort mode"""
+        key = self._keys.get(path)
+        if key is None:
+            key = self._keys[path] = self._make_sort_key(path)
+        return key
+
+    def _make_sort_key(self, path):
+        """Build a sort key from the cached stat and probe of a path"""
+        name_key = self._name_keys.get(path)
+        if name_key is None:
+            name_key = self._name_keys[path] = natural_key(os.path.basename(path))
+
+        if self.sort_mode == 'name':
+            return (name_key, path)
+
+        stat = self.stats.get(path)
+        if self.sort_mode == 'modified':
+            return (stat.st_mtime_ns if stat else 0, name_key, path)
+        if self.sort_mode == 'size':
+            return (stat.st_size if stat else 0, name_key, path)
+
+        # EXIF dates are 'YYYY:MM:DD HH:MM:SS'; files without one sort by mtime
+        probe = self.probes.get(path)
+        date = probe.get('capture_date') if probe else None
+        if date is None and stat:
+            date = time.strftime('%Y:%m:%d %H:%M:%S', time.localtime(stat.st_mtime))
+        return (date or '', name_key, path)
+
+    def resort(self):
+        """Rebuild every sort key and sort again"""
+        self._keys.clear()
+        self.paths.sort(key=self.sort_key)
+        self._positions = None
+
+    def set_sort_mode(self, sort_mode):
+        """Re-sort the index; 'taken' order is refined once outstanding probes finish"""
+        if sort_mode not in SORT_MODES:
+            raise ValueError(f"Unknown sort mode: {sort_mode}")
+        if sort_mode != self.sort_mode:
+            self.sort_mode = sort_mode
+            self.resort()
+
+    def get_probe(self, path):
+        """Get the probe result for a path, or None if it is not probed (yet)"""
+        return self.probes.get(path)
+
+    def request_probes(self, paths):
+        """Probe the paths that have no result yet on the background pool"""
+        if not self.probe_reader:
+            return
+
+        missing = [path for path in paths
+                   if path not in self.probes and path not in self._probes_pending]
+        if not missing:
+            return
+
+        if self._probe_executor is None:
+            self._probe_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="probe")
+        self._probes_pending.update(missing)
+        self.probing = True
+
+        for start in range(0, len(missing), self.PROBE_CHUNK):
+            chunk = missing[start:start + self.PROBE_CHUNK]
+            self._probe_executor.submit(self._probe_chunk, chunk, [self.stats.get(path) for path in chunk])
+
+    def _probe_chunk(self, paths, stats):
+        """Probe a chunk of paths on a pool thread and hand the results to poll()"""
+        try:
+            probes = self.probe_reader(paths, stats)
+        except Exception as e:
+            logger.error(f"Error probing images: {e}")
+            probes = [None] * len(paths)
+        self._probe_results.put(list(zip(paths, stats, probes)))
+
+    def poll_probes(self):
+        """Merge finished probes; returns True if any arrived"""
+        merged = False
+        while True:
+            try:
+                results = self._probe_results.get_nowait()
+            except queue.Empty:
+                break
+            for path, stat, probe in results:
+                self._probes_pending.discard(path)
+                # Drop results for files that changed or went away meanwhile
+                if stat is not None and self.stats.get(path) is stat:
+                    self.probes[path] = probe
+            merged = True
+
+        self.probing = bool(self._probes_pending)
+        return merged
+
+    def add(self, path, stat):
+        """Insert a path in sorted position, or refresh its stat if already indexed"""
+        if path in self.stats:
+            # The new stat may move it, and any cached probe is outdated
+            self.remove(path)
+        self.stats[path] = stat
+        bisect.insort(self.paths, path, key=self.sort_key)
+        self._positions = None
+        self.request_probes([path])
+
+    def remove(self, path):
+        """Remove a path if it is indexed"""
+        if path not in self.stats:
+            return
+        position = bisect.bisect_left(self.paths, self.sort_key(path), key=self.sort_key)
+        if position < len(self.paths) and self.paths[position] == path:
+            del self.paths[position]
+        else:
+            self.paths.remove(path)
+        del self.stats[path]
+        self.probes.pop(path, None)
+        self._keys.pop(path, None)
+        self._name_keys.pop(path, None)
+        self._positions = None
+
+    def apply_changes(self, changes):
+        """Apply FolderWatcher changes in place; returns False if a full rescan is needed
+
+        Changes reported while a background scan runs are held and applied
+        once it has been merged, since the scan may have listed a file
+        before it was removed, or missed one created after its position.
+        """
+        if self.scanning:
+            if any(change[0] == 'rescan' for change in changes):
+                return False
+            self._held_changes.extend(changes)
+            return True
+
+        for change in changes:
+            kind = change[0]
+            if kind == 'added':
+                self.add(change[1], change[2])
+            elif kind == 'removed':
+                self.remove(change[1])
+            elif kind == 'renamed':
+                self.remove(change[1])
+                self.add(change[2], change[3])
+            elif kind == 'rescan':
+                return False
+
+        # The directory mtime moved with these changes; don't rescan for them
+        try:
+            self.mtime_ns = os.stat(self.directory or '.').st_mtime_ns
+        except OSError:
+            return False
+        return True
+
+    def get_stat(self, path):
+        """Get the stat result recorded for a path during the scan"""
+        return self.stats.get(path)
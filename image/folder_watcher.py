@@ -0,0 +1,278 @@
+"""Live watching of the current image folder"""
+
+import os
+import queue
+import select
+import struct
+import logging
+import threading
+import ctypes
+import ctypes.util
+
+logger = logging.getLogger(__name__)
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def load_inotify():
+    """Get libc with inotify support, or None when it is not available"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+class FolderWatcher:
+    """Reports files added to, removed from and renamed in a directory
+
+    Uses inotify through ctypes where available and falls back to
+    polling the directory mtime. Changes are put on a queue as
+    ('added', path, stat), ('removed', path) or
+    ('renamed', old_path, new_path, stat) for the Tk thread to apply;
+    ('rescan', directory) means events were lost and the directory must
+    be indexed again.
+    """
+
+    def __init__(self, is_image_name, poll_interval=1.0):
+        self.is_image_name = is_image_name
+        self.poll_interval = poll_interval
+        self.changes = queue.Queue()
+        self.directory = None
+        self.libc = load_inotify()
+        self._stop = None
+        self._thread = None
+
+    def watch(self, directory, known_stats=None):
+        """Start watching a directory, replacing any previous watch
+
+        Returns once the watch is in place, so a scan started afterwards
+        can't miss files created while it runs: they are either listed
+        by the scan or reported here. Without known_stats, the polling
+        fallback takes its own listing as the starting point.
+        """
+        if self.is_watching(directory):
+            return
+
+        self.stop()
+        self.directory = directory
+        self._stop = threading.Event()
+        ready = threading.Event()
+
+        target = self._watch_inotify if self.libc else self._watch_polling
+        self._thread = threading.Thread(
+            target=target, args=(directory, self._stop, known_stats, ready),
+            name="folder-watcher", daemon=True
+        )
+        self._thread.start()
+        ready.wait(timeout=2.0)
+
+    def is_watching(self, directory):
+        """Check if changes to directory are currently being reported"""
+        return directory == self.directory and self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        """Stop watching"""
+        if self._stop:
+            self._stop.set()
+        self._thread = None
+        self.directory = None
+        # Changes from the old watch no longer apply to anything
+        self.poll()
+
+    def poll(self):
+        """Get the changes reported since the last poll"""
+        changes = []
+        while True:
+            try:
+                changes.append(self.changes.get_nowait())
+            except queue.Empty:
+                return changes
+
+    def _stat(self, path):
+        """Stat a path, or None if it vanished or is not a regular file"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat if os.path.isfile(path) else None
+
+    def _watch_inotify(self, directory, stop, known_stats, ready):
+        """Watch with inotify"""
+        scan_dir = directory or '.'
+        fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0 or self.libc.inotify_add_watch(fd, os.fsencode(scan_dir), WATCH_MASK) < 0:
+            logger.warning(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling {scan_dir}")
+            if fd >= 0:
+                os.close(fd)
+            self._watch_polling(directory, stop, known_stats, ready)
+            return
+
+        logger.info(f"Watching {scan_dir} with inotify")
+        ready.set()
+        # Stats reported on IN_CREATE, by path, until the file's IN_CLOSE_WRITE
+        created = {}
+        try:
+            while not stop.is_set():
+                readable, _, _ = select.select([fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                if not self._handle_inotify_events(directory, data, created):
+                    return
+        finally:
+            os.close(fd)
+
+    def _handle_inotify_events(self, directory, data, created):
+        """Turn a buffer of inotify events into changes; False when the watch ended
+        
+        New files are reported on IN_CREATE, so files that are never
+        written (links, empty files) show up too. Their IN_CLOSE_WRITE
+        only reports them again if the file changed since.
+        """
+        moved_from = {}
+        offset = 0
+        while offset < len(data):
+            _, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            raw_name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                self.changes.put(('rescan', directory))
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self.changes.put(('rescan', directory))
+                return False
+
+            name = os.fsdecode(raw_name.rstrip(b'\0'))
+            if mask & IN_ISDIR or not name or name.startswith('.'):
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & IN_MOVED_FROM:
+                created.pop(path, None)
+                moved_from[cookie] = path
+            elif mask & IN_MOVED_TO and cookie in moved_from:
+                self._report_rename(moved_from.pop(cookie), path)
+            elif mask & IN_CREATE:
+                stat = self._report_added(path)
+                if stat:
+                    created[path] = stat
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._report_added(path, created.pop(path, None))
+            elif mask & IN_DELETE:
+                created.pop(path, None)
+                self._report_removed(path)
+
+        # Moved out of the folder, with no matching IN_MOVED_TO
+        for path in moved_from.values():
+            self._report_removed(path)
+        return True
+
+    def _watch_polling(self, directory, stop, known_stats, ready):
+        """Watch by polling the directory mtime and diffing its listing"""
+        scan_dir = directory or '.'
+        logger.info(f"Watching {scan_dir} by polling")
+        try:
+            # Taken before the listing, so anything created during it shows up as a change
+            mtime_ns = os.stat(scan_dir).st_mtime_ns
+        except OSError:
+            ready.set()
+            return
+        ready.set()
+
+        try:
+            known = dict(known_stats) if known_stats is not None else self._list_images(directory)
+        except OSError:
+            self.changes.put(('rescan', directory))
+            return
+        while not stop.wait(self.poll_interval):
+            try:
+                current_mtime = os.stat(scan_dir).st_mtime_ns
+                if current_mtime == mtime_ns:
+                    continue
+                mtime_ns = current_mtime
+                current = self._list_images(directory)
+            except OSError:
+                self.changes.put(('rescan', directory))
+                return
+
+            removed = {path: known[path] for path in known.keys() - current.keys()}
+            added = [path for path in current.keys() - known.keys()]
+
+            # Rewritten in place: report again so the stat is refreshed
+            for path in current.keys() & known.keys():
+                if current[path].st_mtime_ns != known[path].st_mtime_ns:
+                    self.changes.put(('added', path, current[path]))
+
+            # A removed and an added path with the same inode is a rename
+            removed_by_inode = {(stat.st_dev, stat.st_ino): path for path, stat in removed.items()}
+            for path in added:
+                stat = current[path]
+                old_path = removed_by_inode.pop((stat.st_dev, stat.st_ino), None)
+                if old_path:
+                    self.changes.put(('renamed', old_path, path, stat))
+                else:
+                    self.changes.put(('added', path, stat))
+            for path in removed_by_inode.values():
+                self.changes.put(('removed', path))
+
+            known = current
+
+    def _list_images(self, directory):
+        """Get the stat of every image in the directory"""
+        current = {}
+        with os.scandir(directory or '.') as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not self.is_image_name(entry.name):
+                    continue
+                if entry.is_file():
+                    current[os.path.join(directory, entry.name)] = entry.stat()
+        return current
+
+    def _report_added(self, path, reported=None):
+        """Report a new or rewritten image unless reported is its unchanged stat; returns the stat"""
+        if not self.is_image_name(path):
+            return None
+        stat = self._stat(path)
+        if stat is None:
+            return None
+        if reported is None or (stat.st_size, stat.st_mtime_ns) != (reported.st_size, reported.st_mtime_ns):
+            self.changes.put(('added', path, stat))
+        return stat
+
+    def _report_removed(self, path):
+        if self.is_image_name(path):
+            self.changes.put(('removed', path))
+
+    def _report_rename(self, old_path, new_path):
+        old_is_image = self.is_image_name(old_path)
+        new_is_image = self.is_image_name(new_path)
+        if old_is_image and new_is_image:
+            stat = self._stat(new_path)
+            if stat:
+                self.changes.put(('renamed', old_path, new_path, stat))
+        elif old_is_image:
+            self._report_removed(old_path)
+        elif new_is_image:
+            self._report_added(new_path)
@@ -1,52 +1,419 @@
 """Image loading and file management"""
 
 import os
-import glob
+import io
 import logging
-from PIL import Image
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, ExifTags
+from image.memory import memory_accountant
+from image.directory_index import DirectoryIndex
+from image.pyramid import ImagePyramid
 
 logger = logging.getLogger(__name__)
 
+# ImageLoader of a worker process, created on first use
+_worker_loader = None
+
+
+def get_worker_loader():
+    """Get the ImageLoader used by functions running in worker processes"""
+    global _worker_loader
+    if _worker_loader is None:
+        _worker_loader = ImageLoader()
+    return _worker_loader
+
+
+def start_process_pool(max_workers):
+    """Start a pool of worker processes, or return None where they can't be started"""
+    try:
+        # Forking a process that runs Tk and threads is unsafe; start clean workers
+        return ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Worker processes unavailable ({e})")
+        return None
+
+
+def advise(fd, advice):
+    """Pass an access pattern hint for a whole file to the kernel, where supported"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+
+def read_whole_file(file_path):
+    """Read a file in one large sequential read
+    
+    The kernel is told the file will be read sequentially, which
+    doubles its readahead window; unbuffered readall() then fetches
+    the whole file in a single read of its size instead of the many
+    small reads and seeks a decoder makes.
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        advise(f.fileno(), getattr(os, 'POSIX_FADV_SEQUENTIAL', 0))
+        return f.readall()
+
+
+def advise_willneed(file_paths):
+    """Ask the kernel to start reading files into the page cache in the background
+    
+    Returns straight away; the reads overlap with whatever runs next.
+    """
+    if not hasattr(os, 'POSIX_FADV_WILLNEED'):
+        return
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            advise(fd, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
 
 class ImageLoader:
     """Handles image loading and file list management"""
     
-    def __init__(self):
-        self.supported_extensions = ('*.jpg', '*.jpeg', '*.png', '*.gif', '*.bmp', '*.tiff', '*.webp')
+    def __init__(self, metadata_cache=None, file_cache=None):
+        self.metadata_cache = metadata_cache
+        # Optional FileBytesCache; cached files are decoded from memory
+        self.file_cache = file_cache
+        # Optional probe_many(paths, stats) that probes elsewhere, e.g. in worker processes
+        self.batch_prober = None
+        self.supported_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
+        self.directory_index = None
+        self.sort_mode = 'name'
+        # Modes Image.reduce() cannot handle; these always decode at full size
+        self.unreducible_modes = ImagePyramid.UNREDUCIBLE_MODES
     
-    def load_image(self, file_path):
-        """Load an image from file path"""
+    def read_file(self, file_path):
+        """Get a file's contents through the file cache, reading it on a miss
+        
+        Returns None if the file can't be read.
+        """
+        try:
+            return self.fetch_file(file_path)
+        except OSError as e:
+            logger.debug(f"Could not read {file_path}: {e}")
+            return None
+    
+    def fetch_file(self, file_path):
+        """Like read_file(), but raises OSError if the file can't be read"""
+        key = self.file_cache.make_key(file_path) if self.file_cache else None
+        data = self.file_cache.get(key) if key else None
+        if data is None:
+            data = read_whole_file(file_path)
+            if key:
+                self.file_cache.put(key, data)
+        return data
+    
+    def get_cached_file(self, file_path):
+        """Get a file's contents if the file cache has them, without reading"""
+        if not self.file_cache:
+            return None
+        key = self.file_cache.make_key(file_path)
+        return self.file_cache.get(key) if self.file_cache.contains(key) else None
+    
+    def open_image(self, file_path, data=None):
+        """Open an image from data, reading the whole file (through the file cache) if needed"""
+        if data is None:
+            data = self.fetch_file(file_path)
+        return Image.open(io.BytesIO(data))
+    
+    def load_image(self, file_path, target_size=None, data=None):
+        """Load and fully decode an image, optionally at reduced size
+        
+        With a target_size the image is decoded at the smallest power-of-two
+        reduction that still covers it: JPEGs use libjpeg DCT scaling via
+        draft(), other formats are reduced right after decoding. The
+        full-resolution size is kept in image.info['full_size']. The file's
+        contents are taken from data or the file cache when available and
+        otherwise read in bulk before decoding.
+        """
         try:
             logger.info(f"Loading image: {file_path}")
-            image = Image.open(file_path)
-            return image
+            image = self.open_image(file_path, data)
+            full_size = image.size
+            
+            if target_size and image.format == 'JPEG':
+                image.draft(image.mode, target_size)
+            
+            # Decode now so callers on worker threads pay the cost, not the UI
+            image.load()
+            
+            if target_size and image.mode not in self.unreducible_modes:
+                factor = self.get_reduce_factor(image.size, target_size)
+                if factor > 1:
+                    decoded = image
+                    image = image.reduce(factor)
+                    # Free the full decode now rather than whenever it is collected
+                    decoded.close()
+            
+            image.info['full_size'] = full_size
+            return memory_accountant.track(image, 'decoded')
         except Exception as e:
             logger.error(f"Failed to load image {file_path}: {e}")
             return None
     
+    def load_preview(self, file_path):
+        """Load a cheap low-resolution preview for the first paint
+        
+        Uses the embedded EXIF thumbnail when it matches the image's aspect
+        ratio, otherwise a 1/8 scale draft decode. Only JPEGs get a preview;
+        returns None for everything else.
+        """
+        try:
+            # Only the header and EXIF thumbnail are read from disk, unlike
+            # the full decode; don't wait for a bulk read of the whole file
+            data = self.get_cached_file(file_path)
+            image = Image.open(io.BytesIO(data) if data is not None else file_path)
+            if image.format != 'JPEG':
+                image.close()
+                return None
+            
+            full_size = image.size
+            preview = self.get_exif_thumbnail(image)
+            if preview is None:
+                image.draft(image.mode, (max(1, full_size[0] // 8), max(1, full_size[1] // 8)))
+                image.load()
+                preview = image
+            else:
+                image.close()
+            
+            preview.info['full_size'] = full_size
+            return memory_accountant.track(preview, 'decoded')
+        except Exception as e:
+            logger.debug(f"No preview for {file_path}: {e}")
+            return None
+    
+    def load_thumbnail(self, file_path, size):
+        """Decode a thumbnail that fits in a size x size box
+        
+        JPEGs are decoded at the smallest DCT scale that still covers the
+        box. The result is RGB, or RGBA for images with transparency, and
+        is turned upright per the EXIF orientation, as the freedesktop
+        cache it is shared through expects.
+        """
+        try:
+            with Image.open(file_path) as image:
+                full_size = image.size
+                image.draft('RGB', (size, size))
+                has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+                thumbnail = ImageOps.exif_transpose(image.convert('RGBA' if has_alpha else 'RGB'))
+                # Orientations 5-8 swap width and height
+                if image.getexif().get(ExifTags.Base.Orientation, 1) in (5, 6, 7, 8):
+                    full_size = full_size[::-1]
+            thumbnail.thumbnail((size, size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+            thumbnail.info['full_size'] = full_size
+            return memory_accountant.track(thumbnail, 'thumbnail')
+        except Exception as e:
+            logger.debug(f"No thumbnail for {file_path}: {e}")
+            return None
+    
+    @staticmethod
+    def get_exif_thumbnail(image):
+        """Extract the embedded EXIF thumbnail, if it has the image's aspect ratio"""
+        exif_data = image.info.get('exif')
+        if not exif_data:
+            return None
+        
+        ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset = ifd1.get(0x0201)  # JPEGInterchangeFormat
+        length = ifd1.get(0x0202)  # JPEGInterchangeFormatLength
+        if not offset or not length:
+            return None
+        
+        # Offsets are relative to the TIFF header that follows the Exif marker
+        if exif_data.startswith(b'Exif\x00\x00'):
+            exif_data = exif_data[6:]
+        
+        thumbnail = Image.open(io.BytesIO(exif_data[offset:offset + length]))
+        thumbnail.load()
+        
+        # Letterboxed thumbnails would show bars when stretched to the full size
+        image_ratio = image.width / image.height
+        thumbnail_ratio = thumbnail.width / thumbnail.height
+        if abs(image_ratio - thumbnail_ratio) > 0.05 * image_ratio:
+            return None
+        
+        return thumbnail
+    
+    @staticmethod
+    def get_reduce_factor(image_size, target_size):
+        """Get the largest power-of-two reduction that keeps the image covering target_size"""
+        factor = 1
+        while (image_size[0] // (factor * 2) >= target_size[0] and
+               image_size[1] // (factor * 2) >= target_size[1]):
+            factor *= 2
+        return factor
+    
+    @staticmethod
+    def get_full_size(image):
+        """Get the full-resolution size of a possibly reduced image"""
+        return image.info.get('full_size', image.size)
+    
+    def create_directory_index(self, directory):
+        """Create an empty index for a directory in the current sort order"""
+        return DirectoryIndex(directory, self.supported_extensions, self.probe_many, self.sort_mode)
+    
+    def set_sort_mode(self, sort_mode):
+        """Change the order of the image list, re-sorting the current index in place"""
+        if self.directory_index is not None:
+            self.directory_index.set_sort_mode(sort_mode)
+        self.sort_mode = sort_mode
+    
+    def probe(self, file_path, stat=None):
+        """Read an image's dimensions and metadata from its header, without decoding
+        
+        Returns a dict with width, height, mode, format, frames (None for
+        an animation of unknown length), EXIF
+        orientation and capture date, plus the file size and mtime from
+        stat (taken from the directory index when not given), or None if
+        the file can't be opened.
+        """
+        try:
+            if stat is None:
+                index = self.directory_index
+                stat = index.get_stat(file_path) if index is not None else None
+            if stat is None:
+                stat = os.stat(file_path)
+            
+            with Image.open(file_path) as image:
+                exif = image.getexif()
+                date = (exif.get_ifd(ExifTags.IFD.Exif).get(ExifTags.Base.DateTimeOriginal)
+                        or exif.get(ExifTags.Base.DateTime))
+                if isinstance(date, bytes):
+                    date = date.decode('ascii', 'replace')
+                
+                # GIFs don't store a frame count; counting walks every frame,
+                # so only check for a second one and leave the count unknown
+                if image.format == 'GIF':
+                    frames = None if image.is_animated else 1
+                else:
+                    frames = getattr(image, 'n_frames', 1)
+                
+                return {
+                    'width': image.width,
+                    'height': image.height,
+                    'mode': image.mode,
+                    'format': image.format,
+                    'frames': frames,
+                    'orientation': exif.get(ExifTags.Base.Orientation, 1),
+                    'capture_date': date.strip('\0 ') or None if isinstance(date, str) else None,
+                    'file_size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                }
+        except Exception as e:
+            logger.debug(f"Could not probe {file_path}: {e}")
+            return None
+    
+    def probe_many(self, file_paths, stats):
+        """Probe several images, answering from the metadata cache where it is up to date"""
+        cached = self.metadata_cache.get_many(file_paths, stats) if self.metadata_cache else {}
+        
+        misses = [(file_path, stat) for file_path, stat in zip(file_paths, stats) if file_path not in cached]
+        if misses:
+            miss_paths, miss_stats = [list(values) for values in zip(*misses)]
+            if self.batch_prober:
+                miss_probes = self.batch_prober(miss_paths, miss_stats)
+            else:
+                miss_probes = [self.probe(file_path, stat) for file_path, stat in misses]
+            
+            for file_path, stat, probe in zip(miss_paths, miss_stats, miss_probes):
+                cached[file_path] = probe
+                if self.metadata_cache:
+                    self.metadata_cache.put(stat, probe)
+        
+        return [cached[file_path] for file_path in file_paths]
+    
+    def get_directory_index(self, file_path):
+        """Get the index of the file's directory, rescanning only if it changed"""
+        directory = os.path.dirname(file_path)
+        index = self.directory_index
+        
+        if index is None or index.directory != directory or index.is_stale():
+            if index is not None:
+                index.close()
+            index = self.create_directory_index(directory).scan()
+            self.directory_index = index
+        return index
+    
+    def open_directory(self, file_path, watched=False):
+        """Get the index of the file's directory, enumerating it in the background if needed
+        
+        A new index is seeded with file_path itself, so the opened file can
+        be shown and navigated from before the scan has finished. Merge the
+        scan's progress with index.poll(). When the directory is watched,
+        its changes arrive through apply_directory_changes() and its mtime,
+        which also moves for files that aren't images, is not checked;
+        otherwise a stale index is rescanned in place.
+        """
+        directory = os.path.dirname(file_path)
+        index = self.directory_index
+        
+        if index is not None and index.directory == directory:
+            if file_path not in index.stats and self.is_valid_image_file(file_path):
+                try:
+                    index.add(file_path, os.stat(file_path))
+                except OSError:
+                    pass
+            if not watched and index.is_stale():
+                try:
+                    index.start_scan()
+                except OSError as e:
+                    logger.error(f"Error rescanning {directory}: {e}")
+            return index
+        
+        if index is not None:
+            index.close()
+        index = self.create_directory_index(directory)
+        if self.is_valid_image_file(file_path):
+            try:
+                index.add(file_path, os.stat(file_path))
+            except OSError:
+                pass
+        
+        self.directory_index = index
+        try:
+            index.start_scan()
+        except OSError as e:
+            logger.error(f"Error scanning {directory}: {e}")
+        return index
+    
+    def apply_directory_changes(self, changes):
+        """Apply FolderWatcher changes to the current index, rescanning in the background if events were lost"""
+        index = self.directory_index
+        if index is None or not changes:
+            return index
+        
+        if not index.apply_changes(changes):
+            try:
+                index.start_scan()
+            except OSError as e:
+                logger.error(f"Error rescanning {index.directory}: {e}")
+        return index
+    
     def get_image_list(self, file_path):
         """Get list of images in the same directory as the given file"""
         if not file_path:
             return []
         
         try:
-            directory = os.path.dirname(file_path)
-            image_list = []
-            
-            for ext in self.supported_extensions:
-                image_list.extend(glob.glob(os.path.join(directory, ext)))
-                image_list.extend(glob.glob(os.path.join(directory, ext.upper())))
-            
-            image_list.sort()
-            logger.info(f"Found {len(image_list)} images in directory")
-            return image_list
-            
+            return self.get_directory_index(file_path).paths
         except Exception as e:
             logger.error(f"Error getting image list: {e}")
             return []
     
     def get_current_index(self, image_list, current_file_path):
         """Get the index of the current file in the image list"""
+        index = self.directory_index
+        if index is not None and image_list is index.paths:
+            position = index.index_of(current_file_path)
+            return position if position is not None else 0
+        
         try:
             return image_list.index(current_file_path)
         except ValueError:
@@ -73,16 +440,17 @@ class ImageLoader:
         if not file_path:
             return False
         
-        valid_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
-        return file_path.lower().endswith(valid_extensions)
+        return file_path.lower().endswith(self.supported_extensions)
     
     def get_file_info(self, file_path):
         """Get file information"""
-        if not file_path or not os.path.exists(file_path):
+        if not file_path:
             return None
         
         try:
-            file_size = os.path.getsize(file_path)
+            index = self.directory_index
+            stat = index.get_stat(file_path) if index is not None else None
+            file_size = stat.st_size if stat else os.path.getsize(file_path)
             filename = os.path.basename(file_path)
             
             return {
@@ -90,6 +458,13 @@ class ImageLoader:
                 'size': file_size,
                 'path': file_path
             }
+        except OSError:
+            return None
         except Exception as e:
             logger.error(f"Error getting file info: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def shutdown(self):
+        """Stop background work on the current directory index"""
+        if self.directory_index is not None:
+            self.directory_index.close()
\ No newline at end of file
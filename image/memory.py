@@ -0,0 +1,77 @@
+"""Memory accounting for decoded images and display surfaces"""
+
+import logging
+import threading
+import weakref
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+def image_bytes(image):
+    """Estimate the memory held by a decoded image"""
+    if image.mode in ('1', 'L', 'P'):
+        pixel_size = 1
+    elif image.mode.startswith('I;16'):
+        pixel_size = 2
+    else:
+        # Pillow stores multi-band and 32-bit modes in 4 bytes per pixel
+        pixel_size = 4
+    return image.width * image.height * pixel_size
+
+
+class MemoryAccountant:
+    """Tracks bytes held by live images and PhotoImages, per category
+
+    Images are counted from track() until their last reference is
+    dropped, which CPython handles immediately through reference
+    counting, so owners free memory by dropping references (or calling
+    Image.close() when they are the sole owner) rather than by forcing
+    a garbage collection.
+    """
+
+    def __init__(self):
+        self._usage = defaultdict(int)
+        self._tracked = {}
+        self._external = {}
+        self._lock = threading.Lock()
+
+    def track(self, image, category):
+        """Count an image under a category until it is freed"""
+        if image is None:
+            return image
+
+        with self._lock:
+            if id(image) in self._tracked:
+                return image
+            size = image_bytes(image)
+            self._tracked[id(image)] = (category, size)
+            self._usage[category] += size
+
+        weakref.finalize(image, self._untrack, id(image))
+        return image
+
+    def _untrack(self, image_id):
+        """Stop counting a freed image"""
+        with self._lock:
+            category, size = self._tracked.pop(image_id, (None, 0))
+            if category:
+                self._usage[category] -= size
+
+    def set_external(self, category, key, size):
+        """Record memory held outside PIL, such as a Tk PhotoImage"""
+        with self._lock:
+            previous = self._external.get((category, key), 0)
+            self._external[(category, key)] = size
+            self._usage[category] += size - previous
+
+    def get_usage(self):
+        """Get current bytes per category, plus the total"""
+        with self._lock:
+            usage = {category: size for category, size in self._usage.items() if size}
+        usage['total'] = sum(usage.values())
+        return usage
+
+
+# Shared by every component that owns image memory
+memory_accountant = MemoryAccountant()
@@ -0,0 +1,172 @@
+"""Persistent cache of image probe results"""
+
+import os
+import queue
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+PROBE_COLUMNS = ('width', 'height', 'mode', 'format', 'frames', 'orientation', 'capture_date')
+
+
+def get_default_path():
+    """Get the cache database path in the viewer's XDG config directory"""
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(config_home, 'mozaic-image-viewer', 'metadata.sqlite3')
+
+
+class MetadataCache:
+    """SQLite cache of ImageLoader.probe() results keyed by file identity
+
+    Rows are keyed on (device, inode) and only used while the file's
+    size and mtime_ns still match, so a rewritten file is probed again
+    and a renamed one is not. Files that failed to probe are remembered
+    too, with NULL columns. Reads run on the calling thread over its own
+    connection and are batched per query; writes are queued to a single
+    writer thread that commits them in batches.
+    """
+
+    # Largest number of inodes looked up per query
+    BATCH_SIZE = 500
+
+    def __init__(self, path=None):
+        self.path = path or get_default_path()
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = queue.Queue()
+        self._writer = None
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = self._connect()
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                " dev INTEGER NOT NULL, ino INTEGER NOT NULL,"
+                " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                " width INTEGER, height INTEGER, mode TEXT, format TEXT,"
+                " frames INTEGER, orientation INTEGER, capture_date TEXT,"
+                " PRIMARY KEY (dev, ino))"
+            )
+            connection.commit()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Metadata cache disabled, could not open {self.path}: {e}")
+            self.enabled = False
+            return
+
+        self._writer = threading.Thread(target=self._write_loop, name="metadata-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        """Get this thread's connection to the database"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get_many(self, paths, stats):
+        """Look up probe results for paths with their stat results
+
+        Returns a dict of path to probe (None for files known not to
+        probe) for every path with an up-to-date row; misses are absent.
+        """
+        if not self.enabled:
+            return {}
+
+        wanted = {}
+        for path, stat in zip(paths, stats):
+            if stat is not None:
+                wanted.setdefault(stat.st_dev, {})[stat.st_ino] = (path, stat)
+
+        found = {}
+        try:
+            connection = self._connect()
+            for dev, by_inode in wanted.items():
+                inodes = list(by_inode)
+                for start in range(0, len(inodes), self.BATCH_SIZE):
+                    chunk = inodes[start:start + self.BATCH_SIZE]
+                    rows = connection.execute(
+                        f"SELECT ino, size, mtime_ns, {', '.join(PROBE_COLUMNS)} FROM probes"
+                        f" WHERE dev = ? AND ino IN ({', '.join('?' * len(chunk))})",
+                        (dev, *chunk)
+                    )
+                    for ino, size, mtime_ns, *values in rows:
+                        path, stat = by_inode[ino]
+                        if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                            continue
+                        found[path] = self._make_probe(values, stat)
+        except sqlite3.Error as e:
+            logger.error(f"Error reading metadata cache: {e}")
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(paths) - len(found)
+        return found
+
+    def _make_probe(self, values, stat):
+        """Turn a row back into a probe dict"""
+        if values[0] is None:
+            return None
+        probe = dict(zip(PROBE_COLUMNS, values))
+        probe['file_size'] = stat.st_size
+        probe['mtime_ns'] = stat.st_mtime_ns
+        return probe
+
+    def put(self, stat, probe):
+        """Queue a probe result (or None for a failed probe) to be written"""
+        if not self.enabled or stat is None:
+            return
+        values = tuple(probe[column] for column in PROBE_COLUMNS) if probe else (None,) * len(PROBE_COLUMNS)
+        self._writes.put((stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, *values))
+
+    def _write_loop(self):
+        """Commit queued rows in batches until closed"""
+        connection = self._connect()
+        while True:
+            row = self._writes.get()
+            if row is None:
+                return
+
+            rows = [row]
+            closing = False
+            while len(rows) < 1000:
+                try:
+                    row = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    closing = True
+                    break
+                rows.append(row)
+
+            try:
+                with connection:
+                    connection.executemany(
+                        f"INSERT OR REPLACE INTO probes VALUES ({', '.join('?' * (4 + len(PROBE_COLUMNS)))})",
+                        rows
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error writing metadata cache: {e}")
+
+            if closing:
+                return
+
+    def get_stats(self):
+        """Get lookup counters"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        """Flush queued writes and stop the writer thread"""
+        if self._writer:
+            self._writes.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+        logger.info(f"Metadata cache closed: {self.get_stats()}")
@@ -0,0 +1,263 @@
+"""Neighbor prefetching for fast navigation"""
+
+import os
+import time
+import logging
+import threading
+import statistics
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from image.loader import advise_willneed
+
+logger = logging.getLogger(__name__)
+
+
+class NavigationModel:
+    """Tracks recent Left/Right steps to tell where and how fast the user is going
+
+    Only single steps count; a jump (e.g. a thumbnail click) or a change
+    of direction starts a new run, so a few quick presses the other way
+    don't inherit the pace of a long skim.
+    """
+
+    def __init__(self, history=6):
+        self.intervals = deque(maxlen=history)
+        self.direction = 0
+        self.last_index = None
+        self.last_time = None
+
+    def record(self, index, count):
+        """Note that the user moved to index in a list of count images"""
+        now = time.monotonic()
+        step = 0
+        if self.last_index is not None and count > 1:
+            step = (index - self.last_index) % count
+            if step > count // 2:
+                step -= count
+
+        if abs(step) == 1:
+            if step != self.direction:
+                self.intervals.clear()
+                self.direction = step
+            self.intervals.append(now - self.last_time)
+        elif step:
+            self.intervals.clear()
+            self.direction = 0
+
+        self.last_index = index
+        self.last_time = now
+
+    def get_interval(self):
+        """Get the current seconds per step, or None outside a run of steps
+
+        The typical recent interval, but never less than the latest one or
+        the time since the last step, so slowing down or stopping counts
+        straight away.
+        """
+        if len(self.intervals) < 2:
+            return None
+        return max(statistics.median(self.intervals), self.intervals[-1],
+                   time.monotonic() - self.last_time)
+
+
+class Prefetcher:
+    """Warms the caches with the images around the current one
+
+    Two tiers: the nearest radius images on either side are decoded into
+    the image cache, and, when the loader has a file cache, the files out
+    to file_radius are read into it undecoded. As the user moves, files
+    entering the near window are decoded from the bytes already in memory
+    (promoted) and decoded images leaving it are dropped, keeping their
+    bytes while they are still in the wide window (demoted).
+
+    Before anything is read, the kernel is asked to start fetching the
+    next hint_count files in the direction of travel, so the disk or
+    server works on several of them at once instead of one cold read
+    per step.
+
+    Both windows follow the NavigationModel fed by record_step(): while
+    the user moves one way they shift ahead, keeping one image behind,
+    and they reach further the faster the user goes (lookahead seconds
+    of travel). When steps come faster than the neighbors can be
+    decoded, is_skimming() turns true and neighbors are decoded as
+    drafts at 1/draft_scale of the target size.
+    """
+
+    def __init__(self, image_loader, image_cache, radius=2, max_workers=1, file_radius=12, hint_count=4,
+                 lookahead=1.0, draft_scale=4):
+        self.image_loader = image_loader
+        self.image_cache = image_cache
+        self.radius = radius
+        self.file_radius = file_radius
+        self.hint_count = hint_count
+        self.lookahead = lookahead
+        self.draft_scale = draft_scale
+        self.max_workers = max_workers
+        self.model = NavigationModel()
+        # Moving average of seconds per full-quality neighbor decode
+        self.decode_time = None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        # Reading is I/O bound, so it runs beside the decodes rather than behind them
+        self.reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readahead")
+        self.generation = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def record_step(self, index, count):
+        """Note a navigation step to index in a list of count images"""
+        self.model.record(index, count)
+
+    def is_skimming(self):
+        """Check if the user is moving faster than neighbors can be decoded"""
+        interval = self.model.get_interval()
+        if interval is None or self.decode_time is None:
+            return False
+        return interval < self.decode_time / self.max_workers
+
+    def get_draft_size(self, target_size):
+        """Get the reduced size to decode at while skimming"""
+        if not target_size:
+            return None
+        return tuple(max(1, length // self.draft_scale) for length in target_size)
+
+    def get_reach(self, radius):
+        """Get how many images ahead and behind a window of radius covers"""
+        direction = self.model.direction
+        if not direction:
+            return radius, radius
+
+        # The same budget, shifted ahead, and stretched with the pace
+        ahead = radius * 2 - 1
+        interval = self.model.get_interval()
+        if interval:
+            ahead += min(radius * 2, int(self.lookahead / interval))
+        return ahead, 1
+
+    def get_neighbors(self, image_list, current_index, radius=None):
+        """Get neighbor paths in the order they are likely to be needed"""
+        count = len(image_list)
+        if count <= 1:
+            return []
+
+        ahead, behind = self.get_reach(radius or self.radius)
+        direction = self.model.direction or 1
+        # Behind the user is less likely than the same distance ahead, unless they are standing still
+        behind_weight = 3 if self.model.direction else 1
+        candidates = sorted(
+            [(distance, current_index + direction * distance) for distance in range(1, ahead + 1)] +
+            [(distance * behind_weight, current_index - direction * distance) for distance in range(1, behind + 1)],
+            key=lambda candidate: candidate[0]
+        )
+
+        neighbors = []
+        for _, index in candidates:
+            path = image_list[index % count]
+            if path != image_list[current_index] and path not in neighbors:
+                neighbors.append(path)
+        return neighbors
+
+    def get_upcoming(self, image_list, current_index, count):
+        """Get the next count paths in the direction of travel"""
+        direction = self.model.direction or 1
+        count = min(count, len(image_list) - 1)
+        return [image_list[(current_index + direction * step) % len(image_list)]
+                for step in range(1, count + 1)]
+
+    def prefetch(self, image_list, current_index, target_size=None):
+        """Schedule decoding of the neighbors of current_index"""
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+
+        if not image_list:
+            return
+        current_path = image_list[current_index]
+        near = self.get_neighbors(image_list, current_index)
+        draft = self.is_skimming()
+        if draft:
+            target_size = self.get_draft_size(target_size) or target_size
+        # Hints go first on the reader, and only cost an open() each
+        self.reader.submit(self._hint, generation, self.get_upcoming(image_list, current_index, self.hint_count))
+
+        # Demote whatever the user has moved away from
+        self.image_cache.retain({current_path, *near})
+        file_cache = self.image_loader.file_cache
+        if file_cache:
+            far = self.get_neighbors(image_list, current_index, self.file_radius)
+            file_cache.retain({current_path, *far})
+
+        for path in near:
+            self.executor.submit(self._warm, generation, path, target_size, draft)
+        if file_cache:
+            self.reader.submit(self._read_ahead, generation, [path for path in far if path not in near],
+                               [current_path, *near])
+
+    def _warm(self, generation, file_path, target_size, draft=False):
+        """Decode one neighbor into the cache"""
+        # A newer prefetch request supersedes this one
+        if generation != self.generation:
+            return
+
+        key = self.image_cache.make_key(file_path, target_size)
+        if key is None or self.image_cache.contains(key):
+            return
+        if target_size and self.image_cache.contains(self.image_cache.make_key(file_path)):
+            return
+
+        with self._lock:
+            if key in self._in_flight:
+                return
+            self._in_flight.add(key)
+
+        try:
+            # Promote: decodes from the file cache, reading the file into it first if needed
+            start = time.perf_counter()
+            image = self.image_loader.load_image(file_path, target_size)
+            if image and not draft:
+                elapsed = time.perf_counter() - start
+                self.decode_time = elapsed if self.decode_time is None else 0.7 * self.decode_time + 0.3 * elapsed
+            if image:
+                self.image_cache.put(key, image)
+                logger.debug(f"Prefetched: {file_path}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def _hint(self, generation, file_paths):
+        """Start kernel readahead of the files about to be needed"""
+        if generation == self.generation:
+            advise_willneed(file_paths)
+
+    def _read_ahead(self, generation, file_paths, reserved_paths):
+        """Read far neighbors into the file cache, nearest first, within its budget
+
+        Room is kept for the reserved (current and near) files whether or
+        not they are cached yet, and reading stops at the first file that
+        would not fit, so filling the wide tier never evicts anything.
+        """
+        file_cache = self.image_loader.file_cache
+        used = sum(self.get_file_size(path) for path in reserved_paths)
+        for file_path in file_paths:
+            if generation != self.generation:
+                return
+            size = self.get_file_size(file_path)
+            if used + size > file_cache.max_bytes:
+                return
+            used += size
+            self.image_loader.read_file(file_path)
+
+    @staticmethod
+    def get_file_size(file_path):
+        """Get a file's size, or 0 if it is gone"""
+        try:
+            return os.path.getsize(file_path)
+        except OSError:
+            return 0
+
+    def shutdown(self):
+        """Stop prefetching"""
+        with self._lock:
+            self.generation += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.reader.shutdown(wait=False, cancel_futures=True)
+        logger.info("Prefetcher stopped")
@@ -1,9 +1,9 @@
 """Image processing and transformation logic"""
 
 import logging
-import gc
-import time
-from PIL import Image, ImageTk
+from PIL import Image
+from image.pyramid import ImagePyramid
+from image.memory import memory_accountant
 
 logger = logging.getLogger(__name__)
 
@@ -11,67 +11,152 @@ logger = logging.getLogger(__name__)
 class ImageProcessor:
     """Handles image processing operations"""
     
-    def __init__(self, max_image_size=4000):
-        self.max_image_size = max_image_size
-        self.zoom_throttle_time = 0
-        self.zoom_throttle_delay = 0.05
-    
-    def process_image(self, original_image, zoom_factor=1.0, rotation_angle=0, 
-                     flip_horizontal=False, flip_vertical=False):
-        """Process image with transformations"""
+    def process_image(self, original_image, zoom_factor=1.0, rotation_angle=0,
+                      flip_horizontal=False, flip_vertical=False,
+                      canvas_width=1, canvas_height=1, image_offset_x=0, image_offset_y=0,
+                      margin=0, quality='full', pyramid=None):
+        """Render the part of the transformed image that is visible on the canvas
+        
+        Rendering runs in cached stages: source level -> oriented level ->
+        scaled viewport. The oriented stage is memoized per orientation in
+        the image's pyramid, so a zoom or pan only redoes the scaling, and
+        only for the viewport rectangle; the cost depends on the canvas
+        size rather than on the image size or zoom level. A margin renders
+        extra pixels around the viewport so small pans can move the
+        existing render instead of producing a new one.
+        
+        quality='fast' uses a cheap filter for renders during interaction;
+        'full' uses LANCZOS for the final, idle render. Downscaled renders
+        sample from the smallest pyramid level that still has enough pixels.
+        
+        Returns (rendered_image, (left, top), zoom_factor) where (left, top)
+        is the canvas position of the rendered image's top-left corner, or
+        (None, None, zoom_factor) if no part of the image is visible.
+        """
         if not original_image:
-            return None
+            return None, None, zoom_factor
         
         try:
-            # Apply transformations
-            display_image = original_image.copy()
+            if pyramid is None:
+                pyramid = ImagePyramid(original_image)
+            orientation = (rotation_angle % 360, flip_horizontal, flip_vertical)
+            
+            # Size of the rotated and flipped image, before and after zoom
+            if rotation_angle % 90 != 0:
+                oriented_width, oriented_height = pyramid.get_oriented(0, *orientation).size
+            else:
+                oriented_width, oriented_height = self.get_display_size(original_image.size, 1.0, rotation_angle)
+            display_width = max(1, int(oriented_width * zoom_factor))
+            display_height = max(1, int(oriented_height * zoom_factor))
             
-            # Apply rotation
-            if rotation_angle != 0:
-                display_image = display_image.rotate(-rotation_angle, expand=True)
+            img_left, img_top = self.get_image_position(
+                display_width, display_height, canvas_width, canvas_height,
+                image_offset_x, image_offset_y
+            )
             
-            # Apply flips
-            if flip_horizontal:
-                display_image = display_image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-            if flip_vertical:
-                display_image = display_image.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+            # Visible region (plus margin) in display coordinates
+            visible_left = max(0, -margin - img_left)
+            visible_top = max(0, -margin - img_top)
+            visible_right = min(display_width, canvas_width + margin - img_left)
+            visible_bottom = min(display_height, canvas_height + margin - img_top)
             
-            # Calculate new size with zoom
-            new_width = int(display_image.width * zoom_factor)
-            new_height = int(display_image.height * zoom_factor)
+            if visible_right <= visible_left or visible_bottom <= visible_top:
+                return None, None, zoom_factor
+            
+            position = (img_left + visible_left, img_top + visible_top)
+            
+            # Scaled stage: reuse the last render if nothing it depends on changed
+            render_key = (
+                orientation, display_width, display_height,
+                visible_left, visible_top, visible_right, visible_bottom, quality
+            )
+            rendered = pyramid.get_last_render(render_key)
+            if rendered is not None:
+                return rendered, position, zoom_factor
             
-            # Limit maximum image size to prevent memory issues
-            if new_width > self.max_image_size or new_height > self.max_image_size:
-                logger.warning(f"Image too large ({new_width}x{new_height}), limiting size")
-                if new_width > new_height:
-                    ratio = self.max_image_size / new_width
-                else:
-                    ratio = self.max_image_size / new_height
-                new_width = int(new_width * ratio)
-                new_height = int(new_height * ratio)
-                # Adjust zoom factor to reflect actual size
-                zoom_factor = new_width / display_image.width
+            # Oriented stage, from the smallest pyramid level with enough pixels
+            level = 0
+            if display_width < oriented_width and rotation_angle % 90 == 0:
+                level = pyramid.get_level_index(zoom_factor)
+            oriented = pyramid.get_oriented(level, *orientation)
             
-            # Apply zoom with size check
-            if zoom_factor != 1.0:
-                display_image = display_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            # Geometry stays in base coordinates; only sampling uses the level
+            scale_x = oriented.width / display_width
+            scale_y = oriented.height / display_height
+            box = (
+                visible_left * scale_x,
+                visible_top * scale_y,
+                visible_right * scale_x,
+                visible_bottom * scale_y,
+            )
             
-            return display_image, zoom_factor
+            if display_width == oriented.width and display_height == oriented.height:
+                rendered = oriented.crop(tuple(round(v) for v in box))
+            else:
+                rendered = oriented.resize(
+                    (visible_right - visible_left, visible_bottom - visible_top), box=box,
+                    **self.get_resample_options(quality, zoom_factor, oriented.mode)
+                )
+            
+            pyramid.set_last_render(render_key, rendered)
+            return rendered, position, zoom_factor
             
         except Exception as e:
             logger.error(f"Error processing image: {e}")
-            return None, zoom_factor
+            return None, None, zoom_factor
+    
+    @staticmethod
+    def get_resample_options(quality, zoom_factor, mode=None):
+        """Get resize() arguments for a render quality tier"""
+        if quality == 'fast':
+            # reducing_gap lets Pillow box-reduce first when shrinking a lot,
+            # which Image.reduce() can't do for some modes
+            reducible = mode not in ImagePyramid.UNREDUCIBLE_MODES
+            return {
+                'resample': Image.Resampling.BILINEAR,
+                'reducing_gap': 2.0 if zoom_factor < 1.0 and reducible else None,
+            }
+        return {'resample': Image.Resampling.LANCZOS}
     
-    def create_photo_image(self, pil_image):
-        """Convert PIL image to PhotoImage for tkinter"""
-        if not pil_image:
-            return None
+    @staticmethod
+    def get_image_position(display_width, display_height, canvas_width, canvas_height,
+                           image_offset_x=0, image_offset_y=0):
+        """Get the canvas position of the displayed image's top-left corner
         
-        try:
-            return ImageTk.PhotoImage(pil_image)
-        except Exception as e:
-            logger.error(f"Error creating PhotoImage: {e}")
-            return None
+        The image is centered when smaller than the canvas, anchored at the
+        top-left when larger, and then shifted by the pan offset.
+        """
+        img_left = max(display_width // 2, canvas_width // 2) + image_offset_x - display_width // 2
+        img_top = max(display_height // 2, canvas_height // 2) + image_offset_y - display_height // 2
+        return img_left, img_top
+    
+    @staticmethod
+    def get_display_size(image_size, zoom_factor, rotation_angle=0):
+        """Get the on-screen size of an image after rotation and zoom"""
+        width, height = image_size
+        if rotation_angle % 180 == 90:
+            width, height = height, width
+        return max(1, int(width * zoom_factor)), max(1, int(height * zoom_factor))
+    
+    @staticmethod
+    def compose_frame(rendered, position, canvas_width, canvas_height, margin=0, background='#000000'):
+        """Place a render on a fixed-size RGB frame covering the canvas plus margin
+        
+        Frames only change size when the canvas does, so the display can
+        paste them into one long-lived PhotoImage. Returns the frame and
+        the canvas position of its top-left corner.
+        """
+        frame = Image.new('RGB', (canvas_width + 2 * margin, canvas_height + 2 * margin), background)
+        offset = (position[0] + margin, position[1] + margin)
+        
+        if rendered.mode == 'P' and 'transparency' in rendered.info:
+            rendered = rendered.convert('RGBA')
+        if rendered.mode in ('RGBA', 'LA'):
+            frame.paste(rendered, offset, rendered)
+        else:
+            frame.paste(rendered, offset)
+        
+        return memory_accountant.track(frame, 'render'), (-margin, -margin)
     
     def calculate_fit_zoom(self, image_width, image_height, canvas_width, canvas_height, rotation_angle=0):
         """Calculate zoom factor to fit image in canvas"""
@@ -86,63 +171,14 @@ class ImageProcessor:
         
         return min(canvas_width / img_width, canvas_height / img_height)
     
-    def crop_image(self, processed_image, canvas_width, canvas_height, image_offset_x=0, image_offset_y=0):
-        """Crop image to visible area"""
-        if not processed_image:
-            return None
-        
-        try:
-            img_width, img_height = processed_image.size
-            
-            # Calculate image position on canvas
-            x_center = max(img_width // 2, canvas_width // 2) + image_offset_x
-            y_center = max(img_height // 2, canvas_height // 2) + image_offset_y
-            
-            # Calculate the top-left corner of the image
-            img_left = x_center - img_width // 2
-            img_top = y_center - img_height // 2
-            
-            # Calculate the visible region (intersection of image and canvas)
-            visible_left = max(0, -img_left)
-            visible_top = max(0, -img_top)
-            visible_right = min(img_width, canvas_width - img_left)
-            visible_bottom = min(img_height, canvas_height - img_top)
-            
-            # Check if there's a visible area to crop
-            if visible_right <= visible_left or visible_bottom <= visible_top:
-                return None
-            
-            # Crop the image to the visible area
-            cropped_image = processed_image.crop((visible_left, visible_top, visible_right, visible_bottom))
-            return cropped_image
-            
-        except Exception as e:
-            logger.error(f"Error cropping image: {e}")
-            return None
-    
-    def should_throttle_zoom(self):
-        """Check if zoom should be throttled"""
-        current_time = time.time()
-        return current_time - self.zoom_throttle_time < self.zoom_throttle_delay
-    
-    def update_throttle_time(self):
-        """Update the throttle time"""
-        self.zoom_throttle_time = time.time()
-    
-    @staticmethod
-    def cleanup_image(image):
-        """Clean up image resources"""
-        try:
-            if image:
-                del image
-            gc.collect()
-        except Exception as e:
-            logger.error(f"Error cleaning up image: {e}")
-    
     @staticmethod
     def save_image_with_format(image, file_path):
         """Save image with proper format handling"""
         try:
+            # Images decoded in worker processes are padded to RGBX
+            if image.mode == 'RGBX':
+                image = image.convert('RGB')
+            
             if file_path.lower().endswith('.jpg') or file_path.lower().endswith('.jpeg'):
                 # Convert to RGB for JPEG (removes transparency)
                 if image.mode in ('RGBA', 'LA'):
@@ -0,0 +1,126 @@
+"""Mipmap pyramid and render stage caches for one image"""
+
+import logging
+import threading
+from PIL import Image
+from image.memory import memory_accountant
+
+logger = logging.getLogger(__name__)
+
+# Single lossless transpose for each (clockwise rotation, flip_h, flip_v),
+# equivalent to rotating first and then flipping
+ORIENTATION_TRANSPOSES = {
+    (0, False, False): None,
+    (0, False, True): Image.Transpose.FLIP_TOP_BOTTOM,
+    (0, True, False): Image.Transpose.FLIP_LEFT_RIGHT,
+    (0, True, True): Image.Transpose.ROTATE_180,
+    (90, False, False): Image.Transpose.ROTATE_270,
+    (90, False, True): Image.Transpose.TRANSVERSE,
+    (90, True, False): Image.Transpose.TRANSPOSE,
+    (90, True, True): Image.Transpose.ROTATE_90,
+    (180, False, False): Image.Transpose.ROTATE_180,
+    (180, False, True): Image.Transpose.FLIP_LEFT_RIGHT,
+    (180, True, False): Image.Transpose.FLIP_TOP_BOTTOM,
+    (180, True, True): None,
+    (270, False, False): Image.Transpose.ROTATE_90,
+    (270, False, True): Image.Transpose.TRANSPOSE,
+    (270, True, False): Image.Transpose.TRANSVERSE,
+    (270, True, True): Image.Transpose.ROTATE_270,
+}
+
+
+class ImagePyramid:
+    """Lazily built power-of-two reductions of a single image
+
+    Level 0 is the image itself and level n is reduced by 2**n. Levels
+    are built on first use with Image.reduce(2) from the level above.
+    The pyramid also memoizes the later render stages for its image:
+    oriented (rotated/flipped) levels and the last scaled render. All of
+    it lives exactly as long as the pyramid, which is owned by whoever
+    owns the image. Levels are freed by dropping references rather than
+    Image.close(), since the render thread may still be using them.
+    """
+
+    # Modes Image.reduce() cannot handle; these only ever have level 0
+    UNREDUCIBLE_MODES = ('1', 'P', 'I;16', 'I;16B', 'I;16L')
+
+    def __init__(self, image, min_size=64):
+        self.levels = [image]
+        self.min_size = min_size
+        self.oriented = {}
+        self.last_render = None
+        self._lock = threading.Lock()
+
+    def get_level_index(self, zoom_factor):
+        """Get the smallest level that still has at least zoom_factor of the base's pixels"""
+        if self.levels[0].mode in self.UNREDUCIBLE_MODES:
+            return 0
+
+        level = 0
+        width, height = self.levels[0].size
+        while (zoom_factor <= 1.0 / (2 ** (level + 1)) and
+               min(width, height) // 2 >= self.min_size):
+            level += 1
+            width, height = (width + 1) // 2, (height + 1) // 2
+        return level
+
+    def get_level(self, level):
+        """Get a level, building it and any missing levels above it"""
+        with self._lock:
+            while len(self.levels) <= level:
+                reduced = memory_accountant.track(self.levels[-1].reduce(2), 'pyramid')
+                logger.debug(f"Built pyramid level {len(self.levels)}: {reduced.width}x{reduced.height}")
+                self.levels.append(reduced)
+            return self.levels[level]
+
+    def get_oriented(self, level, rotation_angle=0, flip_horizontal=False, flip_vertical=False):
+        """Get a level rotated clockwise and flipped, memoized per orientation"""
+        rotation_angle %= 360
+        key = (level, rotation_angle, flip_horizontal, flip_vertical)
+
+        with self._lock:
+            oriented = self.oriented.get(key)
+        if oriented is not None:
+            return oriented
+
+        image = self.get_level(level)
+        if rotation_angle % 90 == 0:
+            transpose = ORIENTATION_TRANSPOSES[(rotation_angle, flip_horizontal, flip_vertical)]
+            if transpose is None:
+                oriented = image
+            else:
+                oriented = memory_accountant.track(image.transpose(transpose), 'pyramid')
+        else:
+            oriented = image.rotate(-rotation_angle, expand=True)
+            if flip_horizontal:
+                oriented = oriented.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+            if flip_vertical:
+                oriented = oriented.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+            memory_accountant.track(oriented, 'pyramid')
+
+        with self._lock:
+            # Rotation and flips rarely change; keep only the current orientation
+            for old_key in [k for k in self.oriented if k[1:] != key[1:]]:
+                del self.oriented[old_key]
+            self.oriented[key] = oriented
+        return oriented
+
+    def get_last_render(self, key):
+        """Get the memoized scaled render if it was made with the same parameters"""
+        with self._lock:
+            if self.last_render and self.last_render[0] == key:
+                return self.last_render[1]
+            return None
+
+    def set_last_render(self, key, render):
+        """Memoize the latest scaled render"""
+        memory_accountant.track(render, 'render')
+        with self._lock:
+            self.last_render = (key, render)
+
+    def clear(self):
+        """Drop every level except the base image, and all memoized stages"""
+        with self._lock:
+            del self.levels[1:]
+            self.oriented.clear()
+            self.last_render = None
@@ -0,0 +1,99 @@
+"""Background rendering with request coalescing"""
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class RenderWorker:
+    """Renders on a dedicated thread with a latest-request-wins mailbox
+
+    Only the newest request is kept while the worker is busy, and every
+    request gets a new generation number; results from older generations
+    are discarded in poll(). Renders are composed onto fixed-size frames
+    so the Tk thread only has to paste them into its PhotoImage.
+    """
+
+    def __init__(self, image_processor, background='#000000'):
+        self.image_processor = image_processor
+        self.background = background
+        self.results = queue.Queue()
+        self.generation = 0
+        self._request = None
+        self._last_frame = None
+        self._running = True
+        self._condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self.thread.start()
+
+    def submit(self, **params):
+        """Request a render with process_image() parameters, replacing any waiting request"""
+        with self._condition:
+            self.generation += 1
+            self._request = (self.generation, params)
+            self._condition.notify()
+            return self.generation
+
+    def _run(self):
+        """Render requests until shut down"""
+        while True:
+            with self._condition:
+                while self._request is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                generation, params = self._request
+                self._request = None
+
+            try:
+                frame, position = self._render(params)
+            except Exception as e:
+                logger.error(f"Error rendering image: {e}")
+                frame, position = None, None
+
+            # Don't bother handing back work that was superseded meanwhile
+            if generation == self.generation:
+                self.results.put((generation, params, frame, position))
+
+    def _render(self, params):
+        """Render and compose a frame, reusing the last frame if the render is unchanged"""
+        rendered, position, _ = self.image_processor.process_image(**params)
+        if rendered is None:
+            return None, None
+
+        # Compare the render by identity; Image equality compares pixels
+        layout = (position, params['canvas_width'], params['canvas_height'], params['margin'])
+        if self._last_frame and self._last_frame[0] is rendered and self._last_frame[1] == layout:
+            return self._last_frame[2]
+
+        result = self.image_processor.compose_frame(
+            rendered, position, params['canvas_width'], params['canvas_height'],
+            params['margin'], self.background
+        )
+        self._last_frame = (rendered, layout, result)
+        return result
+
+    def poll(self):
+        """Get the newest finished render, or None; stale renders are dropped"""
+        latest = None
+        while True:
+            try:
+                generation, params, frame, position = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if generation != self.generation:
+                logger.debug(f"Dropping stale render (generation {generation})")
+                continue
+            latest = (params, frame, position)
+        return latest
+
+    def shutdown(self):
+        """Stop the render thread"""
+        with self._condition:
+            self._running = False
+            self.generation += 1
+            self._condition.notify()
+        logger.info("Render worker stopped")
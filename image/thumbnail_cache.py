@@ -0,0 +1,102 @@
+"""Thumbnail cache shared with other desktop applications"""
+
+import os
+import hashlib
+import logging
+import tempfile
+import urllib.parse
+from PIL import Image, PngImagePlugin
+
+logger = logging.getLogger(__name__)
+
+# Largest edge of each freedesktop thumbnail size directory
+FLAVORS = (('normal', 128), ('large', 256), ('x-large', 512), ('xx-large', 1024))
+
+
+def get_default_path():
+    """Get the freedesktop thumbnail directory"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'thumbnails')
+
+
+class ThumbnailCache:
+    """Reads and writes thumbnails per the freedesktop thumbnail spec
+
+    Thumbnails are PNGs named by the MD5 of the file's URI and carry
+    Thumb::URI and Thumb::MTime text chunks; an entry is only used while
+    Thumb::MTime matches the file. Files are written to a temporary name
+    and renamed into place, so readers (including other applications)
+    never see a partial thumbnail.
+    """
+
+    def __init__(self, size=128, path=None):
+        self.size = size
+        self.path = path or get_default_path()
+        self.flavor, self.flavor_size = next(
+            ((name, edge) for name, edge in FLAVORS if edge >= size), FLAVORS[-1]
+        )
+        self.directory = os.path.join(self.path, self.flavor)
+
+    @staticmethod
+    def get_uri(file_path):
+        """Get the file:// URI the spec hashes, escaped like GLib's g_filename_to_uri()
+
+        Other applications hash GLib's URIs, which leave sub-delimiters such
+        as ( ) + & , unescaped where pathlib would percent-encode them.
+        """
+        return 'file://' + urllib.parse.quote(os.fsencode(os.path.abspath(file_path)), safe="/!$&'()*+,:=@~")
+
+    def get_thumbnail_path(self, uri):
+        """Get where the thumbnail of a URI is stored"""
+        return os.path.join(self.directory, hashlib.md5(uri.encode('utf-8')).hexdigest() + '.png')
+
+    def load(self, file_path, stat):
+        """Get the cached thumbnail of a file, or None if missing or outdated"""
+        uri = self.get_uri(file_path)
+        try:
+            with Image.open(self.get_thumbnail_path(uri)) as thumbnail:
+                if (thumbnail.info.get('Thumb::URI') != uri or
+                        thumbnail.info.get('Thumb::MTime') != str(int(stat.st_mtime))):
+                    return None
+                thumbnail.load()
+                has_alpha = thumbnail.mode in ('RGBA', 'LA', 'PA') or 'transparency' in thumbnail.info
+                result = thumbnail.convert('RGBA' if has_alpha else 'RGB')
+        except (OSError, ValueError):
+            return None
+
+        if max(result.size) > self.size:
+            result.thumbnail((self.size, self.size), Image.Resampling.BILINEAR)
+        return result
+
+    def save(self, file_path, stat, thumbnail, full_size=None):
+        """Store a thumbnail, replacing any previous one atomically"""
+        uri = self.get_uri(file_path)
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Thumb::URI', uri)
+        info.add_text('Thumb::MTime', str(int(stat.st_mtime)))
+        info.add_text('Thumb::Size', str(stat.st_size))
+        if full_size:
+            info.add_text('Thumb::Image::Width', str(full_size[0]))
+            info.add_text('Thumb::Image::Height', str(full_size[1]))
+        info.add_text('Software', 'mozaic-image-viewer')
+
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix='.png', prefix='.tmp-', dir=self.directory)
+        except OSError as e:
+            logger.debug(f"Cannot write thumbnails to {self.directory}: {e}")
+            return False
+
+        try:
+            # mkstemp creates the file 0600, as the spec requires
+            with os.fdopen(fd, 'wb') as output:
+                thumbnail.save(output, 'PNG', pnginfo=info)
+            os.replace(temp_path, self.get_thumbnail_path(uri))
+            return True
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not save thumbnail for {file_path}: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            return False
@@ -0,0 +1,211 @@
+"""Background thumbnail and probe generation in worker processes"""
+
+import io
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, BrokenExecutor
+from PIL import Image
+from image.memory import memory_accountant
+from image.loader import get_worker_loader, start_process_pool
+
+logger = logging.getLogger(__name__)
+
+
+def make_thumbnail(file_path, size, thumbnail_cache=None):
+    """Build one thumbnail in a worker; returns PNG bytes, or None if the file can't be read
+
+    Uses the on-disk cache when given one, generating at the cache's
+    standard size so other applications can use what is stored.
+    """
+    loader = get_worker_loader()
+    thumbnail = None
+    if thumbnail_cache is not None:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        thumbnail = thumbnail_cache.load(file_path, stat)
+        if thumbnail is None:
+            thumbnail = loader.load_thumbnail(file_path, thumbnail_cache.flavor_size)
+            if thumbnail is not None:
+                thumbnail_cache.save(file_path, stat, thumbnail, thumbnail.info.get('full_size'))
+    else:
+        thumbnail = loader.load_thumbnail(file_path, size)
+
+    if thumbnail is None:
+        return None
+    if max(thumbnail.size) > size:
+        thumbnail.thumbnail((size, size), Image.Resampling.BILINEAR)
+
+    # PNG at the fastest level is a fraction of the raw pixels and cheap to decode
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, 'PNG', compress_level=1)
+    return buffer.getvalue()
+
+
+def probe_files(file_paths, stats):
+    """Probe a batch of files in a worker"""
+    loader = get_worker_loader()
+    return [loader.probe(file_path, stat) for file_path, stat in zip(file_paths, stats)]
+
+
+class ThumbnailService:
+    """Generates thumbnails and probes in a pool of worker processes
+
+    Thumbnail requests are dispatched from the Tk thread: request() sets
+    the priority order (nearest to the visible window first) and drops
+    whatever was still waiting, and poll() collects finished work and
+    keeps at most a couple of requests per worker in flight, so a
+    scroll or folder change never waits behind a long backlog. Workers
+    hand back PNG bytes rather than pickled images. Finished thumbnails
+    are kept in a small LRU. Probes run on a separate, smaller pool.
+    Falls back to threads where worker processes can't be started.
+    """
+
+    def __init__(self, size=128, max_workers=None, max_entries=1024, thumbnail_cache=None, probe_workers=1):
+        self.size = size
+        self.thumbnail_cache = thumbnail_cache
+        self.max_entries = max_entries
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.probe_workers = probe_workers
+        self.closed = False
+        self._executor = None
+        self._probe_executor = None
+        self._executor_lock = threading.Lock()
+        self._thumbnails = OrderedDict()
+        self._failed = set()
+        self._pending = []
+        self._in_flight = {}
+
+    @property
+    def executor(self):
+        """Get the thumbnail worker pool, starting it on first use"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = self.start_pool(self.max_workers, "thumbnail")
+            return self._executor
+
+    @property
+    def probe_executor(self):
+        """Get the probe worker pool, starting it on first use
+
+        Folder-wide probes get their own pool so they never queue ahead of
+        the thumbnails of the visible cells.
+        """
+        with self._executor_lock:
+            if self._probe_executor is None:
+                self._probe_executor = self.start_pool(self.probe_workers, "probe")
+            return self._probe_executor
+
+    def start_pool(self, max_workers, name):
+        """Start a pool of worker processes, or threads where processes are unavailable"""
+        if self.closed:
+            # Late callers, e.g. index probe threads at exit, must not start a new pool
+            raise RuntimeError("Thumbnail service is shut down")
+        return start_process_pool(max_workers) or ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+
+    def use_threads(self, reason):
+        """Replace the thumbnail process pool with threads after it failed"""
+        logger.warning(f"Worker processes unavailable ({reason}), using threads")
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="thumbnail")
+
+    def get(self, file_path):
+        """Get a finished thumbnail, or None"""
+        thumbnail = self._thumbnails.get(file_path)
+        if thumbnail is not None:
+            self._thumbnails.move_to_end(file_path)
+        return thumbnail
+
+    def request(self, file_paths):
+        """Generate thumbnails for file_paths in priority order, dropping earlier requests"""
+        self._pending = [path for path in file_paths
+                         if path not in self._thumbnails and path not in self._in_flight
+                         and path not in self._failed]
+        self._pending.reverse()  # Popped from the end
+        self._dispatch()
+
+    def is_busy(self):
+        """Check if thumbnails are waiting or being generated"""
+        return bool(self._pending or self._in_flight)
+
+    def cancel(self):
+        """Drop every waiting request, e.g. when the folder changes"""
+        self._pending = []
+        for future in self._in_flight.values():
+            future.cancel()
+
+    def forget(self, file_path):
+        """Drop a thumbnail whose file changed"""
+        self._thumbnails.pop(file_path, None)
+        self._failed.discard(file_path)
+
+    def probe_many(self, file_paths, stats):
+        """Probe files in the worker pool; blocks the calling (non-Tk) thread"""
+        try:
+            return self.probe_executor.submit(probe_files, file_paths, stats).result()
+        except BrokenExecutor:
+            return probe_files(file_paths, stats)
+
+    def _dispatch(self):
+        """Keep the workers busy with the highest priority requests"""
+        while self._pending and len(self._in_flight) < self.max_workers * 2:
+            file_path = self._pending.pop()
+            try:
+                self._in_flight[file_path] = self.executor.submit(
+                    make_thumbnail, file_path, self.size, self.thumbnail_cache
+                )
+            except RuntimeError as e:
+                logger.error(f"Cannot generate thumbnails: {e}")
+                self._pending = []
+                return
+
+    def poll(self):
+        """Get the thumbnails finished since the last poll as (file_path, image) pairs"""
+        finished = []
+        for file_path, future in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[file_path]
+            if future.cancelled():
+                continue
+
+            try:
+                data = future.result()
+                thumbnail = Image.open(io.BytesIO(data)) if data else None
+                if thumbnail is not None:
+                    thumbnail.load()
+            except BrokenExecutor as e:
+                with self._executor_lock:
+                    if isinstance(self._executor, ProcessPoolExecutor):
+                        self.use_threads(e)
+                self._pending.append(file_path)
+                continue
+            except Exception as e:
+                logger.error(f"Error making thumbnail for {file_path}: {e}")
+                thumbnail = None
+
+            if thumbnail is None:
+                self._failed.add(file_path)
+                continue
+
+            self._thumbnails[file_path] = memory_accountant.track(thumbnail, 'thumbnail')
+            while len(self._thumbnails) > self.max_entries:
+                self._thumbnails.popitem(last=False)
+            finished.append((file_path, thumbnail))
+
+        self._dispatch()
+        return finished
+
+    def shutdown(self):
+        """Stop the worker pools"""
+        self._pending = []
+        with self._executor_lock:
+            self.closed = True
+            for executor in (self._executor, self._probe_executor):
+                if executor is not None:
+                    executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._probe_executor = None
+        logger.info("Thumbnail service stopped")
@@ -41,14 +41,12 @@ class MouseHandler:
             dx = event.x - self.pan_start_x
             dy = event.y - self.pan_start_y
             
-            if self.callbacks.get('update_pan_offset'):
-                self.callbacks['update_pan_offset'](dx, dy)
-            
             self.pan_start_x = event.x
             self.pan_start_y = event.y
             
-            if self.callbacks.get('update_display'):
-                self.callbacks['update_display']()
+            # Moves the existing render; re-renders only when it runs out
+            if self.callbacks.get('pan_image'):
+                self.callbacks['pan_image'](dx, dy)
     
     def handle_mouse_release(self, event):
         """Handle mouse release"""
@@ -123,30 +121,16 @@ class MouseHandler:
             if current_time - last_gesture_time < gesture_throttle:
                 return
             
-            try:
-                widget_x = self.root.winfo_rootx()
-                widget_y = self.root.winfo_rooty()
-                widget_width = self.root.winfo_width()
-                widget_height = self.root.winfo_height()
-                
-                if (widget_x <= x <= widget_x + widget_width and 
-                    widget_y <= y <= widget_y + widget_height):
-                    
-                    # Conservative gesture detection
-                    if abs(dx) > abs(dy) and abs(dx) > 2.0:
-                        last_gesture_time = current_time
-                        if dx > 0:
-                            self.root.after(0, lambda: self.callbacks.get('zoom_in', lambda: None)())
-                        else:
-                            self.root.after(0, lambda: self.callbacks.get('zoom_out', lambda: None)())
-                    elif abs(dy) > 3.0:
-                        last_gesture_time = current_time
-                        if dy > 0:
-                            self.root.after(0, lambda: self.callbacks.get('zoom_in', lambda: None)())
-                        else:
-                            self.root.after(0, lambda: self.callbacks.get('zoom_out', lambda: None)())
-            except Exception as e:
-                logger.debug(f"Error in mouse gesture handler: {e}")
+            # Conservative gesture detection
+            if abs(dx) > abs(dy) and abs(dx) > 2.0:
+                zoom_in = dx > 0
+            elif abs(dy) > 3.0:
+                zoom_in = dy > 0
+            else:
+                return
+            last_gesture_time = current_time
+            # Tk may only be queried on its own thread; check where the pointer is there
+            self.root.after(0, lambda: self.zoom_at_pointer(x, y, zoom_in))
         
         try:
             self.mouse_listener = mouse.Listener(on_scroll=on_scroll)
@@ -156,6 +140,22 @@ class MouseHandler:
         except Exception as e:
             logger.error(f"Failed to start mouse listener: {e}")
     
+    def zoom_at_pointer(self, x, y, zoom_in):
+        """Zoom for a global scroll gesture, only when it happened over the image
+        
+        Scrolling over other widgets, such as the thumbnail grid, is theirs.
+        """
+        try:
+            if not self.callbacks.get('is_over_image') or not self.callbacks['is_over_image'](x, y):
+                return
+        except Exception as e:
+            logger.debug(f"Error in mouse gesture handler: {e}")
+            return
+        
+        callback = self.callbacks.get('zoom_in' if zoom_in else 'zoom_out')
+        if callback:
+            callback()
+    
     def stop_mouse_listener(self):
         """Stop the mouse listener"""
         if self.mouse_listener:
@@ -3,7 +3,9 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinterdnd2 import DND_FILES
+from PIL import ImageTk
 from gnome_theme import COLORS
+from image.memory import memory_accountant
 
 
 class ImageCanvas:
@@ -16,6 +18,10 @@ class ImageCanvas:
         self.h_scrollbar = None
         self.v_scrollbar = None
         self.welcome_text = None
+        
+        # Long-lived display surface, reused across renders
+        self.surface = None
+        self.surface_item = None
         self.create_canvas()
     
     def create_canvas(self):
@@ -119,6 +125,44 @@ class ImageCanvas:
         """Create an image on the canvas"""
         return self.canvas.create_image(x, y, image=image, tags=tags)
     
+    def move_to(self, tag, x, y):
+        """Move tagged items to a new position"""
+        self.canvas.coords(tag, x, y)
+    
+    def show_frame(self, frame, x, y, tags="image"):
+        """Show a rendered frame on the persistent display surface
+        
+        The PhotoImage and canvas item are only created when the frame size
+        changes; otherwise new pixels are pasted into the existing
+        PhotoImage and the item is moved into place.
+        """
+        if self.surface is None or (self.surface.width(), self.surface.height()) != frame.size:
+            self.surface = ImageTk.PhotoImage(frame)
+            memory_accountant.set_external('photo', 'surface', frame.width * frame.height * 4)
+            if self.surface_item is None:
+                self.surface_item = self.canvas.create_image(x, y, image=self.surface, anchor=tk.NW, tags=tags)
+            else:
+                self.canvas.itemconfigure(self.surface_item, image=self.surface, state=tk.NORMAL)
+        else:
+            self.surface.paste(frame)
+            self.canvas.itemconfigure(self.surface_item, state=tk.NORMAL)
+        
+        self.canvas.coords(self.surface_item, x, y)
+        return self.surface
+    
+    def hide_frame(self):
+        """Hide the display surface without releasing it"""
+        if self.surface_item is not None:
+            self.canvas.itemconfigure(self.surface_item, state=tk.HIDDEN)
+    
+    def release_surface(self):
+        """Drop the display surface and its canvas item"""
+        if self.surface_item is not None:
+            self.canvas.delete(self.surface_item)
+        self.surface_item = None
+        self.surface = None
+        memory_accountant.set_external('photo', 'surface', 0)
+    
     def delete_by_tag(self, tag):
         """Delete canvas items by tag"""
         self.canvas.delete(tag)
@@ -147,6 +191,10 @@ class ImageCanvas:
         """Set the canvas cursor"""
         self.canvas.configure(cursor=cursor)
     
+    def contains_pointer(self, x, y):
+        """Check if screen position x, y is over the image area, not another widget"""
+        return self.canvas.winfo_containing(x, y) is self.canvas
+    
     def get_dimensions(self):
         """Get canvas dimensions"""
         return self.canvas.winfo_width(), self.canvas.winfo_height()
@@ -2,6 +2,7 @@
 
 import tkinter as tk
 from gnome_theme import COLORS, FONTS, DIMENSIONS, ICONS
+from image.directory_index import SORT_MODES
 
 
 class HeaderBar:
@@ -11,6 +12,8 @@ class HeaderBar:
         self.parent = parent
         self.callbacks = callbacks
         self.headerbar = None
+        self.sort_menu = None
+        self.sort_var = None
         self.create_headerbar()
     
     def create_headerbar(self):
@@ -41,6 +44,11 @@ class HeaderBar:
         right_frame = tk.Frame(self.headerbar, bg=COLORS['headerbar_bg'])
         right_frame.pack(side=tk.RIGHT, padx=DIMENSIONS['padding_medium'], pady=6)
         
+        # Sort order menu
+        self.menu_btn = self.create_header_button(right_frame, ICONS['menu'], self.show_sort_menu)
+        self.menu_btn.pack(side=tk.RIGHT, padx=3)
+        self.create_sort_menu()
+        
         # Info/sidebar toggle
         self.info_btn = self.create_header_button(
             right_frame, ICONS['info'], self.callbacks.get('toggle_sidebar')
@@ -53,6 +61,44 @@ class HeaderBar:
         )
         self.fullscreen_btn.pack(side=tk.RIGHT, padx=3)
     
+    def create_sort_menu(self):
+        """Create the sort order popup menu"""
+        self.sort_var = tk.StringVar(self.headerbar, value='name')
+        self.sort_menu = tk.Menu(
+            self.headerbar,
+            tearoff=0,
+            bg=COLORS['bg_secondary'],
+            fg=COLORS['fg_primary'],
+            activebackground=COLORS['bg_tertiary'],
+            activeforeground=COLORS['fg_primary'],
+            font=FONTS['default']
+        )
+        self.sort_menu.add_command(label="Sort By", state=tk.DISABLED)
+        for mode, label in SORT_MODES.items():
+            self.sort_menu.add_radiobutton(
+                label=label, value=mode, variable=self.sort_var,
+                command=lambda mode=mode: self.on_sort_selected(mode)
+            )
+    
+    def show_sort_menu(self):
+        """Drop the sort menu down below its button"""
+        x = self.menu_btn.winfo_rootx()
+        y = self.menu_btn.winfo_rooty() + self.menu_btn.winfo_height()
+        try:
+            self.sort_menu.tk_popup(x, y)
+        finally:
+            self.sort_menu.grab_release()
+    
+    def on_sort_selected(self, mode):
+        """Forward a sort menu choice"""
+        if self.callbacks.get('set_sort_mode'):
+            self.callbacks['set_sort_mode'](mode)
+    
+    def set_sort_mode(self, mode):
+        """Reflect the current sort mode in the menu"""
+        if self.sort_var:
+            self.sort_var.set(mode)
+    
     def create_header_button(self, parent, text, command):
         """Create a GNOME-style header button"""
         btn = tk.Button(
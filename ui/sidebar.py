@@ -2,6 +2,7 @@
 
 import tkinter as tk
 from tkinter import ttk
+from PIL import ImageTk
 from gnome_theme import COLORS, FONTS, DIMENSIONS
 
 
@@ -18,11 +19,18 @@ class Sidebar:
         self.filename_label = None
         self.size_label = None
         self.dimensions_label = None
+        self.format_label = None
         
         # Thumbnail components
         self.thumb_canvas = None
         self.thumb_scrollbar = None
-        self.thumb_frame = None
+        
+        # Virtualized thumbnail grid: canvas items exist only for visible cells
+        self.thumb_paths = []
+        self.thumb_cells = {}
+        self.thumb_current = None
+        self.thumb_columns = 1
+        self.cell_size = DIMENSIONS['thumbnail_size'] + DIMENSIONS['padding_small'] * 2
         
         self.create_sidebar()
     
@@ -70,6 +78,12 @@ class Sidebar:
         )
         self.dimensions_label.pack(fill=tk.X, pady=3)
         
+        self.format_label = tk.Label(
+            self.info_frame, bg=COLORS['sidebar_bg'], fg=COLORS['fg_secondary'],
+            font=FONTS['small'], anchor=tk.W
+        )
+        self.format_label.pack(fill=tk.X, pady=3)
+        
         # Thumbnails section
         thumb_header = tk.Frame(self.sidebar, bg=COLORS['sidebar_bg'])
         thumb_header.pack(fill=tk.X, padx=DIMENSIONS['padding_medium'], pady=(DIMENSIONS['padding_large'], DIMENSIONS['padding_small']))
@@ -89,25 +103,31 @@ class Sidebar:
             highlightthickness=0
         )
         self.thumb_scrollbar = ttk.Scrollbar(self.sidebar, orient=tk.VERTICAL, command=self.thumb_canvas.yview)
-        self.thumb_canvas.configure(yscrollcommand=self.thumb_scrollbar.set)
-        
-        self.thumb_frame = tk.Frame(self.thumb_canvas, bg=COLORS['sidebar_bg'])
-        self.thumb_canvas.create_window((0, 0), window=self.thumb_frame, anchor=tk.NW)
+        self.thumb_canvas.configure(yscrollcommand=self.on_thumb_scroll)
         
         self.thumb_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(DIMENSIONS['padding_medium'], 0))
         self.thumb_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.thumb_canvas.bind('<Configure>', lambda e: self.layout_thumbnails())
+        self.thumb_canvas.bind('<Button-1>', self.on_thumb_click)
+        self.thumb_canvas.bind('<MouseWheel>', self.on_thumb_wheel)
+        self.thumb_canvas.bind('<Button-4>', self.on_thumb_wheel)
+        self.thumb_canvas.bind('<Button-5>', self.on_thumb_wheel)
     
     def show(self):
         """Show the sidebar"""
         if not self.visible:
             self.sidebar.pack(side=tk.RIGHT, fill=tk.Y)
             self.visible = True
+            self.layout_thumbnails()
+            self.scroll_to_thumbnail(self.thumb_current)
     
     def hide(self):
         """Hide the sidebar"""
         if self.visible:
             self.sidebar.pack_forget()
             self.visible = False
+            self.clear_thumbnail_cells()
     
     def toggle(self):
         """Toggle sidebar visibility"""
@@ -125,13 +145,171 @@ class Sidebar:
         self.filename_label.config(text=f"File: {info['filename']}")
         self.size_label.config(text=f"Size: {info['size']}")
         self.dimensions_label.config(text=f"Dimensions: {info['dimensions']}")
+        self.format_label.config(text=f"Format: {info['format']}" if info.get('format') else "")
     
     def clear_info(self):
         """Clear sidebar information"""
         self.filename_label.config(text="")
         self.size_label.config(text="")
         self.dimensions_label.config(text="")
+        self.format_label.config(text="")
     
     def is_visible(self):
         """Check if sidebar is visible"""
-        return self.visible
\ No newline at end of file
+        return self.visible
+    
+    # Thumbnail grid
+    def set_thumbnail_paths(self, paths, current_index=None):
+        """Show thumbnails for a list of paths; the list may keep changing in place
+        
+        Cells whose path no longer matches their position are rebuilt;
+        the others, and their PhotoImages, are kept.
+        """
+        self.thumb_paths = paths
+        self.layout_thumbnails(clear=False)
+        self.set_current_thumbnail(current_index)
+    
+    def set_current_thumbnail(self, index):
+        """Highlight the thumbnail of the current image and scroll it into view"""
+        previous = self.thumb_current
+        self.thumb_current = index
+        for cell_index in (previous, index):
+            cell = self.thumb_cells.get(cell_index)
+            if cell:
+                self.thumb_canvas.itemconfigure(cell['frame'], fill=self.get_cell_color(cell_index))
+        if index is not None:
+            self.scroll_to_thumbnail(index)
+    
+    def set_thumbnail(self, path, thumbnail):
+        """Show a finished thumbnail if its cell is on screen"""
+        for cell in self.thumb_cells.values():
+            if cell['path'] == path and cell['photo'] is None:
+                self.fill_cell(cell, thumbnail)
+    
+    def layout_thumbnails(self, clear=True):
+        """Resize the scroll region to the whole grid and redraw the visible cells"""
+        if not self.visible:
+            return
+        
+        columns = max(1, self.thumb_canvas.winfo_width() // self.cell_size)
+        if columns != self.thumb_columns:
+            self.thumb_columns = columns
+            clear = True
+        rows = -(-len(self.thumb_paths) // self.thumb_columns)
+        self.thumb_canvas.configure(scrollregion=(0, 0, self.thumb_columns * self.cell_size, rows * self.cell_size))
+        
+        if clear:
+            self.clear_thumbnail_cells()
+        self.update_visible_thumbnails()
+    
+    def clear_thumbnail_cells(self):
+        """Drop every cell's canvas items and PhotoImage"""
+        for cell in self.thumb_cells.values():
+            self.thumb_canvas.delete(cell['frame'], cell['image'])
+        self.thumb_cells.clear()
+    
+    def update_visible_thumbnails(self):
+        """Create cells for the rows in the scroll window and drop the rest"""
+        if not self.visible:
+            return
+        
+        count = len(self.thumb_paths)
+        top = self.thumb_canvas.canvasy(0)
+        height = self.thumb_canvas.winfo_height()
+        first_row = max(0, int(top // self.cell_size))
+        last_row = int((top + height) // self.cell_size)
+        visible = range(first_row * self.thumb_columns, min(count, (last_row + 1) * self.thumb_columns))
+        
+        for index in [index for index in self.thumb_cells if index not in visible]:
+            cell = self.thumb_cells.pop(index)
+            self.thumb_canvas.delete(cell['frame'], cell['image'])
+        
+        missing = []
+        for index in visible:
+            path = self.thumb_paths[index]
+            cell = self.thumb_cells.get(index)
+            if cell is None or cell['path'] != path:
+                if cell:
+                    self.thumb_canvas.delete(cell['frame'], cell['image'])
+                cell = self.thumb_cells[index] = self.create_cell(index, path)
+            if cell['photo'] is None:
+                missing.append(path)
+        
+        if self.callbacks.get('request_thumbnails'):
+            # Visible cells first, then the rows around them, nearest first
+            page = len(visible)
+            for distance in range(1, page * 2 + 1):
+                for index in (visible.stop - 1 + distance, visible.start - distance):
+                    if 0 <= index < count:
+                        missing.append(self.thumb_paths[index])
+            self.callbacks['request_thumbnails'](missing)
+    
+    def create_cell(self, index, path):
+        """Create the canvas items for one grid cell"""
+        row, column = divmod(index, self.thumb_columns)
+        x, y = column * self.cell_size, row * self.cell_size
+        padding = DIMENSIONS['padding_small'] // 2
+        
+        cell = {
+            'path': path,
+            'photo': None,
+            'frame': self.thumb_canvas.create_rectangle(
+                x + padding, y + padding, x + self.cell_size - padding, y + self.cell_size - padding,
+                fill=self.get_cell_color(index), outline=''
+            ),
+            'image': self.thumb_canvas.create_image(
+                x + self.cell_size // 2, y + self.cell_size // 2, anchor=tk.CENTER
+            ),
+        }
+        
+        get_thumbnail = self.callbacks.get('get_thumbnail')
+        thumbnail = get_thumbnail(path) if get_thumbnail else None
+        if thumbnail is not None:
+            self.fill_cell(cell, thumbnail)
+        return cell
+    
+    def fill_cell(self, cell, thumbnail):
+        """Put a thumbnail image into a cell"""
+        cell['photo'] = ImageTk.PhotoImage(thumbnail)
+        self.thumb_canvas.itemconfigure(cell['image'], image=cell['photo'])
+    
+    def get_cell_color(self, index):
+        """Get the background of a cell, highlighted for the current image"""
+        return COLORS['accent_blue'] if index == self.thumb_current else COLORS['bg_secondary']
+    
+    def scroll_to_thumbnail(self, index):
+        """Scroll so the given thumbnail's row is visible"""
+        rows = -(-len(self.thumb_paths) // self.thumb_columns)
+        if index is None or not rows or not self.visible:
+            return
+        
+        row = index // self.thumb_columns
+        top = self.thumb_canvas.canvasy(0)
+        height = self.thumb_canvas.winfo_height()
+        y = row * self.cell_size
+        if y < top or y + self.cell_size > top + height:
+            self.thumb_canvas.yview_moveto(max(0, y - (height - self.cell_size) / 2) / (rows * self.cell_size))
+    
+    def on_thumb_scroll(self, first, last):
+        """Keep the scrollbar in sync and redraw for the new scroll window"""
+        self.thumb_scrollbar.set(first, last)
+        self.update_visible_thumbnails()
+    
+    def on_thumb_wheel(self, event):
+        """Scroll the thumbnail grid with the mouse wheel"""
+        if event.num == 4 or event.delta > 0:
+            self.thumb_canvas.yview_scroll(-1, 'units')
+        else:
+            self.thumb_canvas.yview_scroll(1, 'units')
+    
+    def on_thumb_click(self, event):
+        """Jump to the image under the pointer"""
+        x = self.thumb_canvas.canvasx(event.x)
+        y = self.thumb_canvas.canvasy(event.y)
+        column = int(x // self.cell_size)
+        if column >= self.thumb_columns:
+            return
+        
+        index = int(y // self.cell_size) * self.thumb_columns + column
+        if 0 <= index < len(self.thumb_paths) and self.callbacks.get('open_index'):
+            self.callbacks['open_index'](index)
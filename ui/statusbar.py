@@ -12,6 +12,7 @@ class StatusBar:
         self.callbacks = callbacks
         self.statusbar = None
         self.status_label = None
+        self.count_label = None
         self.create_statusbar()
     
     def create_statusbar(self):
@@ -28,12 +29,34 @@ class StatusBar:
             font=FONTS['small'],
             anchor=tk.W
         )
+        self.count_label = tk.Label(
+            self.statusbar,
+            text="",
+            bg=COLORS['bg_secondary'],
+            fg=COLORS['fg_tertiary'],
+            font=FONTS['small'],
+            anchor=tk.E
+        )
+        self.count_label.pack(side=tk.RIGHT, padx=DIMENSIONS['padding_small'])
+        
         self.status_label.pack(side=tk.LEFT, padx=DIMENSIONS['padding_small'], fill=tk.X, expand=True)
     
     def set_status(self, text):
         """Update status text"""
         if self.status_label:
-            self.status_label.config(text=text)
+            self.status_label.config(text=text, fg=COLORS['fg_tertiary'])
+    
+    def set_loading(self, text):
+        """Show a loading state while an image is being decoded"""
+        if self.status_label:
+            self.status_label.config(text=f"Loading {text}…", fg=COLORS['accent_blue'])
+    
+    def set_count(self, count, complete=True):
+        """Show the number of images in the folder, marked as partial while still counting"""
+        if self.count_label:
+            suffix = "" if complete else "…"
+            noun = "image" if count == 1 and complete else "images"
+            self.count_label.config(text=f"{count:,}{suffix} {noun}")
     
     def show(self):
         """Show the status bar"""